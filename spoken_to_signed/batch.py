@@ -0,0 +1,218 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+from spoken_to_signed.bin import (
+    _gloss_to_pose,
+    _lexicon_input_arguments,
+    _limit_cache_size,
+    _load_pose_lookup,
+    _load_prepared_cache,
+    _text_to_gloss,
+)
+
+STAGES = ["gloss", "pose", "write"]
+
+
+class BatchItem(NamedTuple):
+    index: int
+    id: str
+    text: str
+
+
+class BatchOptions(NamedTuple):
+    glosser: str
+    lexicon: str
+    spoken_language: str
+    signed_language: str
+    output_directory: str
+    shard_size: Optional[int] = None
+    disable_fingerspelling: bool = False
+    cache_directory: Optional[str] = None
+    # Bytes shared by the in-memory pose caches of each worker, None to keep their own bounds
+    cache_size: Optional[int] = None
+    verbose: bool = False
+
+
+class BatchResult(NamedTuple):
+    item: BatchItem
+    timings: dict[str, float]
+    error: Optional[str] = None
+
+
+def validate_id(item_id: str) -> str:
+    # Ids become file names, so they may not point outside of the output directory, or be hidden
+    if item_id == "" or os.path.basename(item_id) != item_id or item_id.startswith(".") or "\\" in item_id:
+        raise ValueError(f"Invalid id {item_id!r}, ids are used as file names")
+    return item_id
+
+
+def read_items(lines: Iterable[str], input_format: str) -> Iterator[BatchItem]:
+    index = 0
+    seen_ids = set()
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.strip() == "":
+            continue
+
+        item_id = None
+        if input_format == "jsonl":
+            entry = json.loads(line)
+            text = entry["text"]
+            item_id = entry.get("id")
+        elif input_format == "tsv" and "\t" in line:
+            item_id, text = line.split("\t", 1)
+        else:
+            text = line
+
+        item_id = validate_id(str(item_id)) if item_id is not None else f"{index:08d}"
+        if item_id in seen_ids:
+            raise ValueError(f"Duplicate id {item_id!r}, every item is written to its own file")
+        seen_ids.add(item_id)
+
+        yield BatchItem(index=index, id=item_id, text=text)
+        index += 1
+
+
+def output_path(options: BatchOptions, item: BatchItem) -> str:
+    directory = options.output_directory
+    if options.shard_size is not None:
+        directory = os.path.join(directory, f"shard-{item.index // options.shard_size:05d}")
+    return os.path.join(directory, f"{item.id}.pose")
+
+
+_options: Optional[BatchOptions] = None
+
+
+def init_worker(options: BatchOptions):
+    # Every worker process loads the lexicon and caches once, and reuses them for all of its items
+    global _options
+    _options = options
+    _load_pose_lookup(options.lexicon, options.disable_fingerspelling)
+    _load_prepared_cache(options.cache_directory)
+    _limit_cache_size(options.lexicon, options.cache_directory, options.cache_size)
+
+
+def translate_item(item: BatchItem) -> BatchResult:
+    options = _options
+    timings = {}
+
+    # The pipeline reports its progress for every sentence, which is only useful when debugging a batch
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if options.verbose else devnull):
+        try:
+            start = time.perf_counter()
+            sentences = _text_to_gloss(
+                item.text,
+                options.spoken_language,
+                options.glosser,
+                options.cache_directory,
+                signed_language=options.signed_language,
+            )
+            timings["gloss"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = _gloss_to_pose(
+                sentences,
+                options.lexicon,
+                options.spoken_language,
+                options.signed_language,
+                options.disable_fingerspelling,
+                options.cache_directory,
+            )
+            timings["pose"] = time.perf_counter() - start
+        except Exception as e:  # noqa: BLE001 - a failing item is reported, and does not stop the batch
+            return BatchResult(item=item, timings=timings, error=str(e))
+
+    start = time.perf_counter()
+    path = output_path(options, item)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        result.pose.write(f)
+    timings["write"] = time.perf_counter() - start
+
+    return BatchResult(item=item, timings=timings)
+
+
+def translate_batch(items: Iterable[BatchItem], options: BatchOptions, workers: int = 1) -> Iterator[BatchResult]:
+    if workers <= 1:
+        init_worker(options)
+        yield from map(translate_item, items)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(options,)) as executor:
+        yield from executor.map(translate_item, items, chunksize=4)
+
+
+def print_report(results: list[BatchResult], elapsed: float, workers: int):
+    stage_times = defaultdict(float)
+    stage_counts = defaultdict(int)
+    for result in results:
+        for stage, seconds in result.timings.items():
+            stage_times[stage] += seconds
+            stage_counts[stage] += 1
+
+    failed = [r for r in results if r.error is not None]
+    print(f"Translated {len(results) - len(failed)} of {len(results)} items in {elapsed:.2f}s with {workers} workers")
+    print(f"Throughput: {len(results) / elapsed:.2f} items/s")
+    for stage in STAGES:
+        if stage_counts[stage] > 0:
+            per_item = stage_times[stage] / stage_counts[stage]
+            throughput = 1 / per_item if per_item > 0 else float("inf")
+            print(f"  {stage:<6} {per_item * 1000:8.1f} ms/item {throughput:8.2f} items/s per worker")
+
+    for result in failed:
+        print(f"Failed {result.item.id}: {result.error}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translate a file of sentences, writing one pose file per sentence")
+    parser.add_argument("--input", type=str, default="-", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=["auto", "jsonl", "tsv", "txt"], default="auto")
+    parser.add_argument("--output-directory", type=str, required=True)
+    parser.add_argument("--shard-size", type=int, help="number of pose files per output subdirectory")
+    parser.add_argument("--glosser", choices=["simple", "spacylemma", "rules", "nmt"], required=True)
+    parser.add_argument("--spoken-language", type=str, required=True)
+    parser.add_argument("--signed-language", type=str, required=True)
+    _lexicon_input_arguments(parser)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--cache-size", type=int, default=1024, help="Megabytes of memory for the pose caches, split between workers"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    input_format = args.format
+    if input_format == "auto":
+        extension = os.path.splitext(args.input)[1].lstrip(".")
+        input_format = extension if extension in ["jsonl", "tsv"] else "txt"
+
+    options = BatchOptions(
+        glosser=args.glosser,
+        lexicon=args.lexicon,
+        spoken_language=args.spoken_language,
+        signed_language=args.signed_language,
+        output_directory=args.output_directory,
+        shard_size=args.shard_size,
+        disable_fingerspelling=args.disable_fingerspelling,
+        cache_directory=args.cache_directory,
+        cache_size=args.cache_size * 1024 * 1024 // max(args.workers, 1),
+        verbose=args.verbose,
+    )
+
+    start = time.perf_counter()
+    with contextlib.nullcontext(sys.stdin) if args.input == "-" else open(args.input, encoding="utf-8") as f:
+        # All items are read first, so that invalid or duplicate ids fail the batch before anything is written
+        items = list(read_items(f, input_format))
+    results = list(translate_batch(items, options, args.workers))
+    print_report(results, time.perf_counter() - start, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,104 @@
 import argparse
+import functools
 import importlib
 import os
 import tempfile
-from itertools import chain
-
-from pose_format import Pose
-
-from spoken_to_signed.gloss_to_pose import (
-    CSVPoseLookup,
-    PoseResult,
-    concatenate_poses,
-    gloss_to_pose,
-)
-from spoken_to_signed.gloss_to_pose.lookup.fingerspelling_lookup import (
-    FingerspellingPoseLookup,
-)
+from typing import TYPE_CHECKING, Optional
+
 from spoken_to_signed.text_to_gloss.types import Gloss
 
+# The pose stack (numpy, scipy, pose_format) is only imported by the commands that use it, to keep startup fast
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pose_format import Pose
+
+    from spoken_to_signed.gloss_to_pose import PoseLookup, PoseResult, PreparedPoseCache
+    from spoken_to_signed.gloss_to_pose.lookup.disk_cache import PoseDiskCache
+    from spoken_to_signed.gloss_to_pose.lookup.fingerspelling_lookup import FingerspellingPoseLookup
+    from spoken_to_signed.lru_cache import LRUCache
+    from spoken_to_signed.text_to_gloss.gloss_cache import GlossCache
 
-def _text_to_gloss(text: str, language: str, glosser: str, **kwargs) -> list[Gloss]:
+
+def _text_to_gloss(text: str, language: str, glosser: str, cache_directory: str = None, **kwargs) -> list[Gloss]:
     module = importlib.import_module(f"spoken_to_signed.text_to_gloss.{glosser}")
-    return module.text_to_gloss(text=text, language=language, **kwargs)
+    version = [getattr(module, "GLOSSER_VERSION", None), getattr(module, "MODEL", None)]
+    return _load_gloss_cache(cache_directory).get_or_gloss(
+        glosser, version, text, language, kwargs, lambda: module.text_to_gloss(text=text, language=language, **kwargs)
+    )
+
+
+@functools.cache
+def _load_gloss_cache(cache_directory: str = None) -> "GlossCache":
+    from spoken_to_signed.text_to_gloss.gloss_cache import GlossCache
+
+    # Glosses are kept in memory for the process, and persisted next to the prepared poses when given a directory
+    if cache_directory is None:
+        return GlossCache()
+    os.makedirs(cache_directory, exist_ok=True)
+    return GlossCache(os.path.join(cache_directory, "glosses.sqlite"))
+
+
+@functools.cache
+def _load_pose_lookup(lexicon: str, disable_fingerspelling: bool = True) -> "PoseLookup":
+    from spoken_to_signed.gloss_to_pose import CompiledPoseLookup, CSVPoseLookup
+    from spoken_to_signed.gloss_to_pose.lookup.compiled_lookup import has_compiled_index
+
+    if not disable_fingerspelling:
+        # Shares the index and caches of the lookup without fingerspelling
+        return _load_pose_lookup(lexicon, True).with_backup(_load_fingerspelling_lookup())
+
+    # Prefer the compiled index when it exists, as it avoids parsing index.csv
+    lookup = CompiledPoseLookup(lexicon) if has_compiled_index(lexicon) else CSVPoseLookup(lexicon)
+    # Only remote (gs://) poses are kept on disk, local ones are read directly. The disk cache does no I/O until
+    # the first remote pose is read, so lexicons are not scanned for remote paths up front.
+    lookup.disk_cache = _load_pose_disk_cache()
+    return lookup
+
+
+@functools.cache
+def _load_pose_disk_cache() -> "PoseDiskCache":
+    from spoken_to_signed.gloss_to_pose.lookup.disk_cache import PoseDiskCache
+
+    # Remote lexicon poses are downloaded once per host, and shared by all processes
+    return PoseDiskCache(os.path.join(os.path.expanduser("~"), ".sign", "poses"))
+
+
+@functools.cache
+def _load_fingerspelling_lookup() -> "FingerspellingPoseLookup":
+    from spoken_to_signed.gloss_to_pose.lookup.fingerspelling_lookup import FingerspellingPoseLookup
+
+    return FingerspellingPoseLookup()
+
+
+@functools.cache
+def _load_prepared_cache(cache_directory: str = None) -> "PreparedPoseCache":
+    from spoken_to_signed.gloss_to_pose import PreparedPoseCache
+
+    return PreparedPoseCache(cache_directory)
+
+
+def _pose_caches(lexicon: str, cache_directory: str = None) -> dict[str, "LRUCache"]:
+    # The in-memory pose caches of this process, all bounded by bytes
+    lookup = _load_pose_lookup(lexicon, True)
+    fingerspelling_lookup = _load_pose_lookup(lexicon, False)
+    return {
+        "poses": lookup.cache,
+        "results": lookup.result_cache,
+        "results_with_fingerspelling": fingerspelling_lookup.result_cache,
+        "fingerspelling_poses": fingerspelling_lookup.backup.cache,
+        "fingerspelling": fingerspelling_lookup.backup.result_cache,
+        "prepared_poses": _load_prepared_cache(cache_directory).memory,
+    }
+
+
+def _limit_cache_size(lexicon: str, cache_directory: str = None, max_bytes: Optional[int] = None):
+    # Splits one budget evenly between the pose caches, instead of bounding each of them separately
+    if max_bytes is None:
+        return
+    caches = _pose_caches(lexicon, cache_directory).values()
+    for cache in caches:
+        cache.resize(max_bytes // len(caches))
 
 
 def _gloss_to_pose(
@@ -29,13 +107,31 @@ def _gloss_to_pose(
     spoken_language: str,
     signed_language: str,
     disable_fingerspelling: bool = False,
-) -> PoseResult:
-    backup = None if disable_fingerspelling else FingerspellingPoseLookup()
-    pose_lookup = CSVPoseLookup(lexicon, backup=backup)
-    results = [gloss_to_pose(gloss, pose_lookup, spoken_language, signed_language) for gloss in sentences]
-    if len(results) == 1:
-        return results[0]
-    return PoseResult(pose=concatenate_poses([r.pose for r in results], trim=False))
+    cache_directory: str = None,
+) -> "PoseResult":
+    from spoken_to_signed.gloss_to_pose import PoseResult, assemble_poses, results_to_pose
+
+    # Lookups and caches are loaded once per process, and shared by all calls
+    pose_lookup = _load_pose_lookup(lexicon, disable_fingerspelling)
+    prepared_cache = _load_prepared_cache(cache_directory)
+    # All sentences are planned together, so a sign repeated across sentences is read once
+    plans = [pose_lookup.plan(gloss, spoken_language, signed_language) for gloss in sentences]
+    sentence_results = pose_lookup.execute_plans(plans)
+    if len(sentence_results) == 1:
+        return results_to_pose(sentence_results[0], prepared_cache=prepared_cache)
+
+    # Sentences are translated independently, and only their junctions are smoothed when they are assembled
+    poses = _load_sentence_executor().map(
+        lambda results: results_to_pose(results, prepared_cache=prepared_cache).pose, sentence_results
+    )
+    return PoseResult(pose=assemble_poses(list(poses)))
+
+
+@functools.cache
+def _load_sentence_executor() -> "ThreadPoolExecutor":
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(thread_name_prefix="sentence")
 
 
 def _get_models_dir():
@@ -47,7 +143,7 @@ def _get_models_dir():
     return models_dir
 
 
-def _pose_to_video(pose: Pose, video_path: str):
+def _pose_to_video(pose: "Pose", video_path: str):
     models_dir = _get_models_dir()
     pix2pix_path = os.path.join(models_dir, "pix2pix.h5")
     if not os.path.exists(pix2pix_path):
@@ -91,6 +187,9 @@ def _pose_to_video(pose: Pose, video_path: str):
 def _lexicon_input_arguments(parser: argparse.ArgumentParser):
     parser.add_argument("--lexicon", type=str, required=True)
     parser.add_argument("--disable-fingerspelling", action="store_true", help="Disable fingerspelling fallback")
+    parser.add_argument(
+        "--cache-directory", type=str, help="Directory to persist preprocessed lexicon poses and glosses in"
+    )
 
 
 def _text_input_arguments(parser: argparse.ArgumentParser):
@@ -102,9 +201,9 @@ def _text_input_arguments(parser: argparse.ArgumentParser):
     pre_args, _ = pre_parser.parse_known_args()
 
     if pre_args.lexicon:
-        lookup = CSVPoseLookup(pre_args.lexicon)
-        spoken_languages = list(lookup.words_index.keys())
-        signed_languages = set(chain.from_iterable(lookup.words_index[lang].keys() for lang in spoken_languages))
+        language_pairs = _load_pose_lookup(pre_args.lexicon, True).language_pairs()
+        spoken_languages = list(dict.fromkeys(spoken for spoken, _ in language_pairs))
+        signed_languages = {signed for _, signed in language_pairs}
     else:
         spoken_languages = ["de", "fr", "it", "en"]
         signed_languages = ["sgg", "gsg", "bfi", "ase"]
@@ -130,6 +229,8 @@ def pose_to_video():
     args_parser.add_argument("--video", type=str, required=True)
     args = args_parser.parse_args()
 
+    from pose_format import Pose
+
     with open(args.pose, "rb") as f:
         pose = Pose.read(f.read())
 
@@ -147,9 +248,14 @@ def text_to_gloss_to_pose():
     args_parser.add_argument("--pose", type=str, required=True)
     args = args_parser.parse_args()
 
-    sentences = _text_to_gloss(args.text, args.spoken_language, args.glosser)
+    sentences = _text_to_gloss(args.text, args.spoken_language, args.glosser, args.cache_directory)
     result = _gloss_to_pose(
-        sentences, args.lexicon, args.spoken_language, args.signed_language, args.disable_fingerspelling
+        sentences,
+        args.lexicon,
+        args.spoken_language,
+        args.signed_language,
+        args.disable_fingerspelling,
+        args.cache_directory,
     )
 
     with open(args.pose, "wb") as f:
@@ -167,9 +273,16 @@ def text_to_gloss_to_pose_to_video():
     args_parser.add_argument("--video", type=str, required=True)
     args = args_parser.parse_args()
 
-    sentences = _text_to_gloss(args.text, args.spoken_language, args.glosser, signed_language=args.signed_language)
+    sentences = _text_to_gloss(
+        args.text, args.spoken_language, args.glosser, args.cache_directory, signed_language=args.signed_language
+    )
     result = _gloss_to_pose(
-        sentences, args.lexicon, args.spoken_language, args.signed_language, args.disable_fingerspelling
+        sentences,
+        args.lexicon,
+        args.spoken_language,
+        args.signed_language,
+        args.disable_fingerspelling,
+        args.cache_directory,
     )
     _pose_to_video(result.pose, args.video)
 
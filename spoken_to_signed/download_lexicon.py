@@ -1,6 +1,10 @@
 import argparse
 import csv
+import itertools
 import os
+from collections import deque
+from collections.abc import Collection, Iterable, Iterator
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from datetime import datetime
 
 from pose_format import Pose, PoseHeader
@@ -8,6 +12,9 @@ from pose_format.numpy import NumPyPoseBody
 from pose_format.utils.reader import BufferReader
 from tqdm import tqdm
 
+from spoken_to_signed.gloss_to_pose.lookup.compiled_lookup import compile_index, compiled_index_path
+from spoken_to_signed.gloss_to_pose.lookup.pose_store import pack_poses, pose_store_path
+
 LEXICON_INDEX = ["path", "spoken_language", "signed_language", "start", "end", "words", "glosses", "priority"]
 
 
@@ -17,9 +24,51 @@ def init_index(index_path: str):
         with open(index_path, "w", encoding="utf-8", newline="") as file:
             writer = csv.writer(file)
             writer.writerow(LEXICON_INDEX)
+        return
+
+    # An interrupted download may leave a partially written row behind, which is dropped to resume cleanly
+    with open(index_path, "rb+") as file:
+        content = file.read()
+        if not content.endswith(b"\n"):
+            file.truncate(content.rfind(b"\n") + 1)
+
+
+def indexed_paths(directory: str) -> set[str]:
+    # Rows are only added once their pose file is written, so indexed poses are the checkpoint to resume from
+    index_path = os.path.join(directory, "index.csv")
+    if not os.path.isfile(index_path):
+        return set()
+    init_index(index_path)
+    with open(index_path, encoding="utf-8", newline="") as file:
+        return {row["path"] for row in csv.DictReader(file)}
+
+
+def write_pose(path: str, pose: Pose):
+    # Write to a temporary file first, so that an interrupted download never leaves a partial pose file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        pose.write(f)
+    os.replace(f"{path}.tmp", path)
 
 
-def load_signsuisse(directory_path: str) -> list[dict[str, str]]:
+def ordered_writes(rows: Iterable[tuple[Future, dict[str, str]]], max_pending: int) -> Iterator[dict[str, str]]:
+    # Yields every row once its pose file is written, in order, keeping a bounded number of poses in memory
+    pending = deque()
+    for future, row in rows:
+        pending.append((future, row))
+        while len(pending) > 0 and (len(pending) > max_pending or pending[0][0].done()):
+            future, row = pending.popleft()
+            future.result()
+            yield row
+
+    for future, row in pending:
+        future.result()
+        yield row
+
+
+def load_signsuisse(
+    directory_path: str, skip_paths: Collection[str] = (), workers: int = 1
+) -> Iterator[dict[str, str]]:
     try:
         import sign_language_datasets  # noqa: F401
     except ImportError as e:
@@ -47,82 +96,130 @@ def load_signsuisse(directory_path: str) -> list[dict[str, str]]:
     with open(_POSE_HEADERS["holistic"], "rb") as buffer:
         pose_header = PoseHeader.read(BufferReader(buffer.read()))
 
-    for datum in tqdm(dataset["train"]):
-        uid_raw = datum["id"].numpy().decode("utf-8")
-        spoken_language = datum["spokenLanguage"].numpy().decode("utf-8")
-        signed_language = iana_tags[datum["signedLanguage"].numpy().decode("utf-8")]
-        words = datum["name"].numpy().decode("utf-8")
-
-        # Load pose and save to file
-        tf_pose = datum["pose"]
-        fps = int(tf_pose["fps"].numpy())
-        if fps == 0:
-            continue
-        pose_body = NumPyPoseBody(fps, tf_pose["data"].numpy(), tf_pose["conf"].numpy())
-        pose = Pose(pose_header, pose_body)
-        pose_relative_path = os.path.join(signed_language, f"{uid_raw}.pose")
-        os.makedirs(os.path.join(directory_path, signed_language), exist_ok=True)
-        with open(os.path.join(directory_path, pose_relative_path), "wb") as f:
-            pose.write(f)
-
-        yield {
-            "path": pose_relative_path,
-            "spoken_language": spoken_language,
-            "signed_language": signed_language,
-            "words": words,
-            "start": "0",
-            "end": str(len(pose_body.data) / fps),  # pose duration
-            "glosses": "",
-            "priority": "",
-        }
+    def read_dataset(executor: Executor) -> Iterator[tuple[Future, dict[str, str]]]:
+        for datum in tqdm(dataset["train"]):
+            uid_raw = datum["id"].numpy().decode("utf-8")
+            signed_language = iana_tags[datum["signedLanguage"].numpy().decode("utf-8")]
+            pose_relative_path = os.path.join(signed_language, f"{uid_raw}.pose")
+            if pose_relative_path in skip_paths:
+                continue
+
+            spoken_language = datum["spokenLanguage"].numpy().decode("utf-8")
+            words = datum["name"].numpy().decode("utf-8")
+
+            # Load pose and save to file
+            tf_pose = datum["pose"]
+            fps = int(tf_pose["fps"].numpy())
+            if fps == 0:
+                continue
+            pose_body = NumPyPoseBody(fps, tf_pose["data"].numpy(), tf_pose["conf"].numpy())
+            pose = Pose(pose_header, pose_body)
+            future = executor.submit(write_pose, os.path.join(directory_path, pose_relative_path), pose)
+
+            yield (
+                future,
+                {
+                    "path": pose_relative_path,
+                    "spoken_language": spoken_language,
+                    "signed_language": signed_language,
+                    "words": words,
+                    "start": "0",
+                    "end": str(len(pose_body.data) / fps),  # pose duration
+                    "glosses": "",
+                    "priority": "",
+                },
+            )
+
+    # The dataset is read in this thread, while pose files are written by the pool
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from ordered_writes(read_dataset(executor), max_pending=4 * workers)
+
+
+def normalize_rows(rows: list[dict[str, str]]):
+    from spoken_to_signed.text_to_gloss.simple import text_to_gloss
+
+    # Lexicons repeat the same words across entries, so each is glossed once
+    glosses = {}
+    for row in rows:
+        if row["glosses"] == "" and row["words"] != "":
+            key = (row["words"], row["spoken_language"])
+            if key not in glosses:
+                try:
+                    sentences = text_to_gloss(text=row["words"], language=row["spoken_language"])
+                    glosses[key] = " ".join([g for sentence in sentences for w, g in sentence])
+                except ValueError as e:
+                    if not ("Language" in str(e) and "not supported" in str(e)):
+                        raise e
+                    glosses[key] = ""
+            row["glosses"] = glosses[key]
 
 
 def normalize_row(row: dict[str, str]):
-    if row["glosses"] == "" and row["words"] != "":
-        from spoken_to_signed.text_to_gloss.simple import text_to_gloss
-
-        try:
-            sentences = text_to_gloss(text=row["words"], language=row["spoken_language"])
-            glosses = [g for sentence in sentences for w, g in sentence]
-            row["glosses"] = " ".join(glosses)
-        except ValueError as e:
-            if not ("Language" in str(e) and "not supported" in str(e)):
-                raise e
+    normalize_rows([row])
 
 
-def get_data(name: str, directory: str):
+def get_data(name: str, directory: str, skip_paths: Collection[str] = (), workers: int = 1):
     data_loaders = {
         "signsuisse": load_signsuisse,
     }
     if name not in data_loaders:
         raise NotImplementedError(f"{name} is unknown.")
 
-    return data_loaders[name](directory)
+    return data_loaders[name](directory, skip_paths, workers)
 
 
-def add_data(data: list[dict[str, str]], directory: str):
+def add_data(data: Iterable[dict[str, str]], directory: str, batch_size: int = 256):
     index_path = os.path.join(directory, "index.csv")
     os.makedirs(directory, exist_ok=True)
     init_index(index_path)
 
     with open(index_path, "a", encoding="utf-8", newline="") as file:
         writer = csv.writer(file)
-        for row in tqdm(data):
-            normalize_row(row)
-            writer.writerow([row[key] for key in LEXICON_INDEX])
+        rows = iter(tqdm(data))
+        while batch := list(itertools.islice(rows, batch_size)):
+            normalize_rows(batch)
+            writer.writerows([[row[key] for key in LEXICON_INDEX] for row in batch])
+            # Every written batch is a checkpoint, that an interrupted download resumes from
+            file.flush()
 
     print(f"Added entries to {index_path}")
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--name", choices=["signsuisse"], required=True)
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["download", "compile", "pack"],
+        default="download",
+        help="download a lexicon into the directory, compile its index.csv, or pack its pose files for faster loading",
+    )
+    parser.add_argument("--name", choices=["signsuisse"])
     parser.add_argument("--directory", type=str, required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of threads writing pose files")
     args = parser.parse_args()
 
-    data = get_data(args.name, args.directory)
+    if args.command == "compile":
+        compile_index(args.directory)
+        return
+
+    if args.command == "pack":
+        pack_poses(args.directory)
+        return
+
+    if args.name is None:
+        parser.error("the following arguments are required: --name")
+
+    # Entries already in the index are skipped, so an interrupted download resumes where it stopped
+    data = get_data(args.name, args.directory, indexed_paths(args.directory), args.workers)
     add_data(data, args.directory)
 
+    # Keep an existing compiled index and pose store in sync with the new entries
+    if os.path.isdir(compiled_index_path(args.directory)):
+        compile_index(args.directory)
+    if os.path.isdir(pose_store_path(args.directory)):
+        pack_poses(args.directory)
+
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,15 @@
+import functools
+from collections.abc import Iterator
+from concurrent.futures import Executor
 from typing import Union
 
 from pose_format import Pose
 
 from ..text_to_gloss.types import Gloss
-from .concatenate import concatenate_poses
-from .lookup import CSVPoseLookup, PoseLookup, PoseResult
+from .concatenate import assemble_poses, concatenate_poses, concatenate_prepared_poses, parallel_map, prepare_pose
+from .lookup import CompiledPoseLookup, CSVPoseLookup, PoseLookup, PoseResult
+from .prepared_cache import PreparedPoseCache
+from .streaming import stream_prepared_poses
 
 
 def gloss_to_pose(
@@ -14,8 +19,24 @@ def gloss_to_pose(
     signed_language: str,
     source: str = None,
     anonymize: Union[bool, Pose] = False,
+    prepared_cache: PreparedPoseCache = None,
+    executor: Executor = None,
 ) -> PoseResult:
     results = pose_lookup.lookup_sequence(glosses, spoken_language, signed_language, source)
+    return results_to_pose(results, anonymize, prepared_cache, executor)
+
+
+def results_to_pose(
+    results: list[PoseResult],
+    anonymize: Union[bool, Pose] = False,
+    prepared_cache: PreparedPoseCache = None,
+    executor: Executor = None,
+) -> PoseResult:
+    # Anonymization changes the poses before preparation, so cached preparations can not be used
+    if prepared_cache is not None and not anonymize:
+        prepared_poses = [prepared_cache.prepare(r) for r in results]
+        return PoseResult(pose=concatenate_prepared_poses(prepared_poses))
+
     poses = [r.pose for r in results]
 
     if anonymize:
@@ -32,9 +53,27 @@ def gloss_to_pose(
 
         if isinstance(anonymize, Pose):
             print("Transferring appearance...")
-            poses = [transfer_appearance(pose, anonymize) for pose in poses]
+            poses = parallel_map(functools.partial(transfer_appearance, appearance_pose=anonymize), poses, executor)
         else:
             print("Removing appearance...")
-            poses = [remove_appearance(pose) for pose in poses]
+            poses = parallel_map(remove_appearance, poses, executor)
+
+    return PoseResult(pose=concatenate_poses(poses, executor=executor))
+
+
+def stream_gloss_to_pose(
+    glosses: Gloss,
+    pose_lookup: PoseLookup,
+    spoken_language: str,
+    signed_language: str,
+    source: str = None,
+    prepared_cache: PreparedPoseCache = None,
+) -> Iterator[Pose]:
+    """Yields the translated pose in chunks, so that playback can start before the whole sentence is processed."""
+    results = pose_lookup.iter_lookup_sequence(glosses, spoken_language, signed_language, source)
+    if prepared_cache is not None:
+        prepared_poses = (prepared_cache.prepare(r) for r in results)
+    else:
+        prepared_poses = (prepare_pose(r.pose) for r in results)
 
-    return PoseResult(pose=concatenate_poses(poses))
+    yield from stream_prepared_poses(prepared_poses)
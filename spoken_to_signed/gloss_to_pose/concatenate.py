@@ -1,3 +1,5 @@
+import functools
+from concurrent.futures import Executor
 from typing import NamedTuple, Optional
 
 import numpy as np
@@ -9,7 +11,12 @@ from pose_format.utils.generic import (
     reduce_holistic,
 )
 
-from spoken_to_signed.gloss_to_pose.smoothing import smooth_concatenate_poses
+from spoken_to_signed.gloss_to_pose.smoothing import (
+    create_padding,
+    find_best_connection_points,
+    join_segments,
+    smooth_concatenate_poses,
+)
 
 
 class SigningBoundary(NamedTuple):
@@ -19,6 +26,21 @@ class SigningBoundary(NamedTuple):
 
 class ConcatenationSettings:
     is_reduce_holistic = True
+    # "full" smooths the whole concatenation, "junctions" only the transitions between signs, which is much faster
+    smoothing = "full"
+    # How junctions between signs are searched, see `find_best_connection_points`
+    connection_features = "all"
+    connection_dtype = np.float64
+    pca_components = 16
+
+
+def find_junctions(poses: list[Pose]) -> list[tuple[int, int]]:
+    return find_best_connection_points(
+        poses,
+        features=ConcatenationSettings.connection_features,
+        dtype=ConcatenationSettings.connection_dtype,
+        pca_components=ConcatenationSettings.pca_components,
+    )
 
 
 def normalize_pose(pose: Pose) -> Pose:
@@ -48,7 +70,7 @@ def get_signing_boundary(pose: Pose, wrist_index: int, elbow_index: int) -> Sign
     )
 
 
-def trim_pose(pose, start=True, end=True):
+def get_trim_boundary(pose: Pose) -> Optional[SigningBoundary]:
     if len(pose.body.data) == 0:
         raise ValueError("Cannot trim an empty pose")
 
@@ -66,37 +88,72 @@ def trim_pose(pose, start=True, end=True):
             last_frames.append(boundary_end)
 
     if len(first_frames) == 0:
-        return pose
+        return None
+
+    return SigningBoundary(start=min(first_frames), end=max(last_frames))
+
 
-    first_frame = min(first_frames)
-    last_frame = max(last_frames)
+def trim_frames(pose: Pose, boundary: Optional[SigningBoundary], start=True, end=True) -> tuple[int, int]:
+    if boundary is None:
+        return 0, len(pose.body.data)
 
-    if not start:
-        first_frame = 0
-    if not end:
-        last_frame = len(pose.body.data)
+    first_frame = boundary.start if start else 0
+    last_frame = boundary.end if end else len(pose.body.data)
+    return first_frame, last_frame
 
+
+def trim_pose(pose, start=True, end=True):
+    boundary = get_trim_boundary(pose)
+    if boundary is None:
+        return pose
+
+    first_frame, last_frame = trim_frames(pose, boundary, start, end)
     pose.body.data = pose.body.data[first_frame:last_frame]
     pose.body.confidence = pose.body.confidence[first_frame:last_frame]
     return pose
 
 
-def concatenate_poses(poses: list[Pose], trim=True) -> Pose:
+def parallel_map(function, items: list, executor: Optional[Executor] = None) -> list:
+    # Runs independent per-pose steps on the executor, if given. The results keep the order of the items.
+    if executor is None:
+        return [function(item) for item in items]
+    return list(executor.map(function, items))
+
+
+class PreparedPose(NamedTuple):
+    # A reduced and normalized pose, with its trim boundary (None if it should not be trimmed)
+    pose: Pose
+    boundary: Optional[SigningBoundary]
+
+
+def prepare_pose(pose: Pose, trim=True) -> PreparedPose:
     if ConcatenationSettings.is_reduce_holistic:
-        print("Reducing poses...")
-        poses = [reduce_holistic(p) for p in poses]
+        pose = reduce_holistic(pose)
+
+    pose = normalize_pose(pose)
 
-    print("Normalizing poses...")
-    poses = [normalize_pose(p) for p in poses]
+    boundary = get_trim_boundary(pose) if trim else None
+    return PreparedPose(pose=pose, boundary=boundary)
 
-    # Trim the poses to only include the parts where the hands are visible
-    if trim:
-        print("Trimming poses...")
-        poses = [trim_pose(p, i > 0, i < len(poses) - 1) for i, p in enumerate(poses)]
+
+def concatenate_prepared_poses(
+    prepared_poses: list[PreparedPose],
+    junctions: Optional[list[tuple[int, int]]] = None,
+    smoothing: Optional[str] = None,
+) -> Pose:
+    # Trim the poses to only include the parts where the hands are visible.
+    # Prepared poses may be cached, so they are sliced into new poses rather than modified.
+    poses = []
+    for i, (pose, boundary) in enumerate(prepared_poses):
+        first_frame, last_frame = trim_frames(pose, boundary, i > 0, i < len(prepared_poses) - 1)
+        poses.append(Pose(pose.header, pose.body[first_frame:last_frame]))
 
     # Concatenate all poses
     print("Smooth concatenating poses...")
-    pose = smooth_concatenate_poses(poses)
+    smoothing = smoothing if smoothing is not None else ConcatenationSettings.smoothing
+    if junctions is None:
+        junctions = find_junctions(poses)
+    pose = smooth_concatenate_poses(poses, junctions=junctions, smoothing=smoothing)
 
     # Correct the wrists (should be after smoothing)
     print("Correcting wrists...")
@@ -107,3 +164,33 @@ def concatenate_poses(poses: list[Pose], trim=True) -> Pose:
     normalize_pose_size(pose)
 
     return pose
+
+
+def concatenate_poses(
+    poses: list[Pose], trim=True, executor: Optional[Executor] = None, smoothing: Optional[str] = None
+) -> Pose:
+    print("Reducing, normalizing and trimming poses...")
+    prepared_poses = parallel_map(functools.partial(prepare_pose, trim=trim), poses, executor)
+
+    return concatenate_prepared_poses(prepared_poses, smoothing=smoothing)
+
+
+def assemble_poses(poses: list[Pose], padding=0.20) -> Pose:
+    """
+    Joins finished poses, e.g. translated sentences, that are already reduced, normalized, smoothed and scaled.
+    Only the junctions between them are searched, interpolated and smoothed.
+    """
+    if len(poses) == 0:
+        raise ValueError("No poses to assemble")
+
+    if len(poses) == 1:
+        return poses[0]
+
+    junctions = find_junctions(poses)
+    segments = []
+    start = 0
+    for pose, (end, next_start) in zip(poses, junctions + [(len(poses[-1].body.data), None)]):
+        segments.append(Pose(pose.header, pose.body[start:end]))
+        start = next_start
+
+    return join_segments(segments, create_padding(padding, poses[0]))
@@ -1,2 +1,3 @@
+from .compiled_lookup import CompiledPoseLookup
 from .csv_lookup import CSVPoseLookup
-from .lookup import PoseLookup, PoseResult
+from .lookup import LookupPlan, PlannedLookup, PoseLookup, PoseResult
@@ -0,0 +1,167 @@
+import asyncio
+import os
+from typing import Optional
+
+from pose_format import Pose
+
+from spoken_to_signed.text_to_gloss.types import Gloss
+
+from .lookup import LookupPlan, PoseLookup, PoseResult
+
+# Public buckets are read anonymously, like in PoseLookup.read_pose
+DEFAULT_STORAGE_OPTIONS = {"gs": {"anon": True}, "gcs": {"anon": True}}
+
+
+class AsyncPoseReader:
+    """
+    Reads pose files from any fsspec filesystem with asyncio.
+    One filesystem (and its connections) is kept per protocol, and concurrent reads of the same path share one request.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        retries: int = 3,
+        backoff: float = 0.2,
+        retry_on: tuple[type[BaseException], ...] = (OSError, asyncio.TimeoutError),
+        storage_options: Optional[dict[str, dict]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff  # seconds before the first retry, doubled for every following one
+        self.retry_on = retry_on
+        self.storage_options = storage_options if storage_options is not None else DEFAULT_STORAGE_OPTIONS
+
+        # Filesystems, the semaphore and pending reads belong to the event loop they were created in
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.file_systems = {}
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.pending: dict[str, asyncio.Future] = {}
+
+    def bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.file_systems = {}
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.pending = {}
+
+    async def get_file_system(self, protocol: str):
+        if protocol not in self.file_systems:
+            import fsspec
+            from fsspec.asyn import AsyncFileSystem
+
+            options = self.storage_options.get(protocol, {})
+            file_system_class = fsspec.get_filesystem_class(protocol)
+            if issubclass(file_system_class, AsyncFileSystem):
+                file_system = file_system_class(asynchronous=True, skip_instance_cache=True, **options)
+                if hasattr(file_system, "set_session"):
+                    await file_system.set_session()
+            else:
+                file_system = file_system_class(**options)
+            self.file_systems[protocol] = file_system
+        return self.file_systems[protocol]
+
+    async def read_bytes(self, path: str) -> bytes:
+        from fsspec.core import split_protocol
+
+        protocol, _ = split_protocol(path)
+        file_system = await self.get_file_system(protocol or "file")
+        if getattr(file_system, "async_impl", False):
+            return await file_system._cat_file(path)
+        # Synchronous filesystems (e.g. local files or memory) are read without blocking the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, file_system.cat_file, path)
+
+    async def read_with_retries(self, path: str) -> Pose:
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return Pose.read(await self.read_bytes(path))
+                except FileNotFoundError:
+                    raise
+                except self.retry_on:
+                    if attempt == self.retries:
+                        raise
+                await asyncio.sleep(self.backoff * 2**attempt)
+
+    async def read_pose(self, path: str) -> Pose:
+        self.bind_loop()
+        if path not in self.pending:
+            future = asyncio.ensure_future(self.read_with_retries(path))
+            self.pending[path] = future
+            future.add_done_callback(lambda _: self.pending.pop(path, None))
+        # Shielded, so a cancelled caller does not cancel the read for the others waiting on it
+        return await asyncio.shield(self.pending[path])
+
+    async def close(self):
+        for file_system in self.file_systems.values():
+            session = getattr(file_system, "_session", None) or getattr(file_system, "session", None)
+            if session is not None and hasattr(session, "close"):
+                await session.close()
+        self.file_systems = {}
+
+
+class AsyncPoseLookup:
+    """
+    Looks up gloss sequences with a PoseLookup, reading the lexicon files of a plan concurrently with asyncio.
+    Poses are read into the lookup's cache, so synchronous lookups benefit from them as well.
+    """
+
+    def __init__(self, lookup: PoseLookup, reader: Optional[AsyncPoseReader] = None):
+        self.lookup = lookup
+        self.reader = reader if reader is not None else AsyncPoseReader()
+
+    def pose_url(self, pose_path: str) -> str:
+        if "://" in pose_path:
+            return pose_path
+
+        if self.lookup.directory is None:
+            raise ValueError("Can't access pose files without specifying a directory")
+
+        return os.path.join(self.lookup.directory, pose_path)
+
+    def is_cached(self, pose_path: str) -> bool:
+        pose_store = self.lookup.pose_store
+        if pose_store is not None and pose_path in pose_store:
+            return True
+        if pose_path in self.lookup.cache:
+            return True
+        disk_cache = self.lookup.disk_cache
+        return disk_cache is not None and pose_path.startswith("gs://") and pose_path in disk_cache
+
+    def missing_paths(self, plans: list[LookupPlan]) -> set[str]:
+        return {
+            planned.row["path"]
+            for plan in plans
+            for planned in plan.lookups
+            if planned.row is not None and not self.is_cached(planned.row["path"])
+        }
+
+    def store(self, pose_path: str, pose: Pose):
+        self.lookup.cache.set(pose_path, pose)
+        # Like PoseLookup.read_pose, remote files are also kept on disk for other processes
+        if self.lookup.disk_cache is not None and pose_path.startswith("gs://"):
+            self.lookup.disk_cache.set(pose_path, pose)
+
+    async def prefetch(self, plans: list[LookupPlan]):
+        paths = sorted(self.missing_paths(plans))
+        poses = await asyncio.gather(*[self.reader.read_pose(self.pose_url(p)) for p in paths], return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        for path, pose in zip(paths, poses):
+            # Failed reads are left to the synchronous load, which reports them like any other lookup
+            if isinstance(pose, Pose):
+                await loop.run_in_executor(None, self.store, path, pose)
+
+    async def lookup_sequences(
+        self, sentences: list[Gloss], spoken_language: str, signed_language: str, source: str = None
+    ) -> list[list[PoseResult]]:
+        plans = [self.lookup.plan(glosses, spoken_language, signed_language, source) for glosses in sentences]
+        await self.prefetch(plans)
+        # The remaining work (slicing cached poses, fingerspelling) is local
+        return await asyncio.get_running_loop().run_in_executor(None, self.lookup.execute_plans, plans)
+
+    async def lookup_sequence(
+        self, glosses: Gloss, spoken_language: str, signed_language: str, source: str = None
+    ) -> list[PoseResult]:
+        [results] = await self.lookup_sequences([glosses], spoken_language, signed_language, source)
+        return results
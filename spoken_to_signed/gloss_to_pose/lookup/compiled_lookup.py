@@ -0,0 +1,168 @@
+import csv
+import os
+from functools import cached_property
+from typing import Optional
+
+import numpy as np
+
+from spoken_to_signed.lru_cache import LRUCache
+
+from .directory import replacing_directory
+from .disk_cache import PoseDiskCache
+from .lookup import PoseLookup
+from .result_cache import LookupResultCache
+from .string_table import StringTable, write_string_table
+
+COMPILED_INDEX_DIRECTORY = "index.compiled"
+
+ROW_DTYPE = np.dtype(
+    [
+        ("path", np.int32),
+        ("words", np.int32),
+        ("glosses", np.int32),
+        ("start", np.int64),
+        ("end", np.int64),
+        ("priority", np.int64),
+    ]
+)
+
+INDEXED_COLUMNS = ("words", "glosses")
+
+
+def compiled_index_path(directory: str) -> str:
+    return os.path.join(directory, COMPILED_INDEX_DIRECTORY)
+
+
+def has_compiled_index(directory: str) -> bool:
+    # A compiled index older than index.csv is stale, and should not be used
+    index_path = os.path.join(directory, "index.csv")
+    marker_path = os.path.join(compiled_index_path(directory), "rows.npy")
+    if not os.path.isfile(marker_path):
+        return False
+    return not os.path.isfile(index_path) or os.path.getmtime(marker_path) >= os.path.getmtime(index_path)
+
+
+def index_key(spoken_language: str, signed_language: str, term: str) -> bytes:
+    return f"{spoken_language}\0{signed_language}\0{term.lower()}".encode()
+
+
+def compile_index(directory: str):
+    with open(os.path.join(directory, "index.csv"), encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    # All strings (paths and original terms) are interned into a single table
+    strings_ids = {}
+
+    def intern(value: str) -> int:
+        if value not in strings_ids:
+            strings_ids[value] = len(strings_ids)
+        return strings_ids[value]
+
+    table = np.zeros(len(rows), dtype=ROW_DTYPE)
+    for i, d in enumerate(rows):
+        table[i] = (
+            intern(d["path"]),
+            intern(d["words"]),
+            intern(d["glosses"]),
+            int(d["start"]),
+            int(d["end"]),
+            int(d["priority"]),
+        )
+
+    with replacing_directory(compiled_index_path(directory)) as index_directory:
+        write_string_table(index_directory, "strings", [s.encode() for s in strings_ids])
+
+        for based_on in INDEXED_COLUMNS:
+            # Group rows by key, keeping the original order of rows within each key
+            keys = {}
+            for i, d in enumerate(rows):
+                keys.setdefault(index_key(d["spoken_language"], d["signed_language"], d[based_on]), []).append(i)
+            sorted_keys = sorted(keys)
+
+            spans = np.zeros(len(sorted_keys) + 1, dtype=np.int64)
+            np.cumsum([len(keys[k]) for k in sorted_keys], out=spans[1:])
+            key_rows = np.array([i for k in sorted_keys for i in keys[k]], dtype=np.int32)
+
+            write_string_table(index_directory, f"{based_on}_keys", sorted_keys)
+            np.save(os.path.join(index_directory, f"{based_on}_spans.npy"), spans)
+            np.save(os.path.join(index_directory, f"{based_on}_rows.npy"), key_rows)
+
+        language_pairs = sorted({f"{d['spoken_language']}\0{d['signed_language']}".encode() for d in rows})
+        write_string_table(index_directory, "languages", language_pairs)
+
+        # Written last, as its presence marks the index as complete
+        np.save(os.path.join(index_directory, "rows.npy"), table)
+
+    print(f"Compiled {len(rows)} entries to {compiled_index_path(directory)}")
+
+
+class CompiledIndex:
+    """Memory-mapped lexicon index written by `compile_index`."""
+
+    def __init__(self, directory: str):
+        index_directory = compiled_index_path(directory)
+        self.rows = np.load(os.path.join(index_directory, "rows.npy"), mmap_mode="r")
+        self.strings = StringTable(index_directory, "strings")
+        self.languages = StringTable(index_directory, "languages")
+        self.keys = {based_on: StringTable(index_directory, f"{based_on}_keys") for based_on in INDEXED_COLUMNS}
+        self.spans = {
+            based_on: np.load(os.path.join(index_directory, f"{based_on}_spans.npy"), mmap_mode="r")
+            for based_on in INDEXED_COLUMNS
+        }
+        self.key_rows = {
+            based_on: np.load(os.path.join(index_directory, f"{based_on}_rows.npy"), mmap_mode="r")
+            for based_on in INDEXED_COLUMNS
+        }
+
+    def language_pairs(self) -> list[tuple[str, str]]:
+        return [tuple(self.languages[i].decode().split("\0")) for i in range(len(self.languages))]
+
+    def find(self, based_on: str, spoken_language: str, signed_language: str, term: str) -> Optional[list[dict]]:
+        key_index = self.keys[based_on].find(index_key(spoken_language, signed_language, term))
+        if key_index is None:
+            return None
+
+        spans = self.spans[based_on]
+        row_ids = self.key_rows[based_on][spans[key_index] : spans[key_index + 1]]
+        return [self.make_row(self.rows[i], based_on) for i in row_ids]
+
+    def make_row(self, row, based_on: str) -> dict:
+        return {
+            "path": self.strings[row["path"]].decode(),
+            "term": self.strings[row[based_on]].decode(),
+            "start": int(row["start"]),
+            "end": int(row["end"]),
+            "priority": int(row["priority"]),
+        }
+
+
+class CompiledPoseLookup(PoseLookup):
+    def __init__(
+        self,
+        directory: str,
+        backup: PoseLookup = None,
+        cache: LRUCache = None,
+        result_cache: LookupResultCache = None,
+        disk_cache: PoseDiskCache = None,
+    ):
+        if not has_compiled_index(directory):
+            raise ValueError(
+                f"Directory {directory} has no up-to-date compiled index. "
+                f"Run `download_lexicon compile --directory {directory}` first."
+            )
+
+        # The in-memory dictionary indexes stay empty, rows are read from the compiled index instead
+        super().__init__(
+            rows=[], directory=directory, backup=backup, cache=cache, result_cache=result_cache, disk_cache=disk_cache
+        )
+
+    @cached_property
+    def index(self) -> CompiledIndex:
+        # Loaded lazily, so that constructing the lookup is free
+        return CompiledIndex(self.directory)
+
+    def language_pairs(self) -> list[tuple[str, str]]:
+        return self.index.language_pairs()
+
+    def get_rows(self, based_on: str, spoken_language: str, signed_language: str, term: str) -> Optional[list]:
+        return self.index.find(based_on, spoken_language, signed_language, term)
@@ -1,15 +1,28 @@
 import csv
 import os
 
+from spoken_to_signed.lru_cache import LRUCache
+
+from .disk_cache import PoseDiskCache
 from .lookup import PoseLookup
+from .result_cache import LookupResultCache
 
 
 class CSVPoseLookup(PoseLookup):
-    def __init__(self, directory: str, backup: PoseLookup = None):
+    def __init__(
+        self,
+        directory: str,
+        backup: PoseLookup = None,
+        cache: LRUCache = None,
+        result_cache: LookupResultCache = None,
+        disk_cache: PoseDiskCache = None,
+    ):
         if not os.path.exists(directory):
             raise ValueError(f"Directory {directory} does not exist")
 
         with open(os.path.join(directory, "index.csv"), encoding="utf-8") as f:
             rows = list(csv.DictReader(f))
 
-        super().__init__(rows=rows, directory=directory, backup=backup)
+        super().__init__(
+            rows=rows, directory=directory, backup=backup, cache=cache, result_cache=result_cache, disk_cache=disk_cache
+        )
@@ -0,0 +1,31 @@
+import contextlib
+import os
+import shutil
+import uuid
+
+
+@contextlib.contextmanager
+def replacing_directory(path: str):
+    """
+    Yields a temporary sibling directory to write into, which replaces `path` once it is complete.
+    Files are never rewritten in place, so processes that memory-mapped the previous version keep reading it.
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    temporary = os.path.join(parent, f".{name}.{uuid.uuid4().hex}.tmp")
+    os.mkdir(temporary)
+    try:
+        yield temporary
+    except BaseException:
+        shutil.rmtree(temporary, ignore_errors=True)
+        raise
+
+    # A directory can only be renamed over an empty one, so the previous version is moved aside first.
+    # In between, the directory is missing, and lookups fall back to the files it was built from.
+    previous = None
+    if os.path.exists(path):
+        previous = os.path.join(parent, f".{name}.{uuid.uuid4().hex}.old")
+        os.replace(path, previous)
+    os.replace(temporary, path)
+    if previous is not None:
+        # Mapped files stay readable after they are unlinked
+        shutil.rmtree(previous, ignore_errors=True)
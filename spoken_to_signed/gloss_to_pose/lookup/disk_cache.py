@@ -0,0 +1,141 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+import time
+from io import BytesIO
+from typing import Callable, Optional
+
+import numpy as np
+import numpy.ma as ma
+from pose_format import Pose, PoseHeader
+from pose_format.numpy import NumPyPoseBody
+from pose_format.utils.reader import BufferReader
+
+# Bump whenever the stored arrays change, to invalidate entries written by older versions
+POSE_CACHE_VERSION = 1
+
+# Temporary files older than this were left behind by a writer that crashed, and are removed when sweeping
+ORPHAN_AGE = 60 * 60
+
+
+def pose_to_arrays(pose: Pose) -> dict[str, np.ndarray]:
+    header_buffer = BytesIO()
+    pose.header.write(header_buffer)
+    return {
+        "header": np.frombuffer(header_buffer.getvalue(), dtype=np.uint8),
+        "fps": np.array(pose.body.fps),
+        "data": ma.getdata(pose.body.data),
+        "mask": ma.getmaskarray(pose.body.data),
+        "confidence": pose.body.confidence,
+    }
+
+
+def pose_from_arrays(arrays) -> Pose:
+    header = PoseHeader.read(BufferReader(arrays["header"].tobytes()))
+    data = ma.masked_array(arrays["data"], mask=arrays["mask"])
+    body = NumPyPoseBody(fps=arrays["fps"].item(), data=data, confidence=arrays["confidence"])
+    return Pose(header, body)
+
+
+def save_arrays(path: str, **arrays: np.ndarray):
+    # Write to a temporary file first, so that concurrent readers never see a partial file
+    directory = os.path.dirname(path)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+        np.savez(f, **arrays)
+    os.replace(f.name, path)
+
+
+class PoseDiskCache:
+    """
+    Keeps decoded remote pose files on local disk, so that every process on a host downloads them only once.
+    Entries are evicted least recently used first, using their modification time, which is refreshed on every read.
+    Sweeping walks the whole directory, so it only happens once every `sweep_bytes` written by this process,
+    and the directory may exceed `max_bytes` by that much (per writing process) in between.
+
+    Entries are keyed by URL, not by content, so that a hit costs no request at all. A pose replaced at the same URL
+    keeps being served from the cache until it is evicted, so the cache must be cleared (see `clear`) when a remote
+    lexicon changes its files in place.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: Optional[int] = 2 * 1024 * 1024 * 1024,
+        sweep_bytes: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if sweep_bytes is None and max_bytes is not None:
+            sweep_bytes = max_bytes // 16
+        self.sweep_bytes = sweep_bytes
+        self.unswept_bytes = 0  # written since the last sweep
+
+    def path(self, url: str) -> str:
+        # Keyed by URL, see the class documentation
+        key = hashlib.sha1(f"v{POSE_CACHE_VERSION}|{url}".encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    def __contains__(self, url: str) -> bool:
+        return os.path.isfile(self.path(url))
+
+    def get(self, url: str) -> Optional[Pose]:
+        path = self.path(url)
+        try:
+            with np.load(path) as f:
+                pose = pose_from_arrays(f)
+        except FileNotFoundError:
+            return None
+
+        # Another process may have evicted the entry in the meantime, it was read all the same
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        return pose
+
+    def set(self, url: str, pose: Pose):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_arrays(path, **pose_to_arrays(pose))
+        if self.max_bytes is not None:
+            self.unswept_bytes += os.path.getsize(path)
+            if self.unswept_bytes >= self.sweep_bytes:
+                self.evict()
+
+    def get_or_fetch(self, url: str, fetch: Callable[[str], Pose]) -> Pose:
+        pose = self.get(url)
+        if pose is None:
+            pose = fetch(url)
+            self.set(url, pose)
+        return pose
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        orphaned_before = time.time() - ORPHAN_AGE
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                with contextlib.suppress(FileNotFoundError):
+                    if name.endswith(".npz"):
+                        stat = os.stat(path)
+                        entries.append((stat.st_mtime, stat.st_size, path))
+                    elif name.endswith(".tmp") and os.path.getmtime(path) < orphaned_before:
+                        os.remove(path)
+        return entries
+
+    def clear(self):
+        for _, _, path in self.entries():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        self.unswept_bytes = 0
+
+    def evict(self):
+        self.unswept_bytes = 0
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            # Processes evict concurrently, so an entry may already be gone
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
@@ -1,43 +1,178 @@
+import functools
+import threading
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Optional
 
-from pose_format import Pose
+import numpy as np
+from pose_format import Pose, PoseHeader
+from pose_format.numpy import NumPyPoseBody
 
-from .. import CSVPoseLookup, concatenate_poses
+from .. import CSVPoseLookup, concatenate_prepared_poses, parallel_map
+from ..concatenate import PreparedPose, SigningBoundary, prepare_pose, trim_frames
+from ..smoothing import find_best_connection_points, find_connection_table
 from .lookup import PoseResult
 
+# Marks the trie nodes where a letter ends. Letters are never empty, so it can not collide with a character
+TRIE_LETTER = ""
+
+
+def make_trie(letters: list[str]) -> dict:
+    trie = {}
+    for letter in letters:
+        node = trie
+        for character in letter:
+            node = node.setdefault(character, {})
+        node[TRIE_LETTER] = letter
+    return trie
+
+
+class FingerspellingAlphabet:
+    """
+    The letters of a single language pair, prepared once and stored together in one array,
+    with the junctions between every ordered pair of letters.
+    """
+
+    def __init__(self, rows: dict[str, list], get_pose, stretch, executor: Optional[Executor] = None):
+        self.rows = rows
+        self.get_pose = get_pose
+        self.stretch = stretch
+
+        self.letters = sorted(rows.keys(), key=len, reverse=True)
+        self.letter_indexes = {letter: i for i, letter in enumerate(self.letters)}
+        self.trie = make_trie(self.letters)
+
+        # Names and other fingerspelled words tend to repeat, so their segmentations are memoized
+        self.segment = functools.lru_cache(maxsize=4096)(self._segment)
+
+        poses = [get_pose(rows[letter][0]) for letter in self.letters]
+        prepared = parallel_map(prepare_pose, poses, executor)
+
+        self.headers: list[PoseHeader] = [p.pose.header for p in prepared]
+        self.fps: list[float] = [p.pose.body.fps for p in prepared]
+        self.boundaries: list[Optional[SigningBoundary]] = [p.boundary for p in prepared]
+
+        lengths = [len(p.pose.body.data) for p in prepared]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.data = np.concatenate([np.ma.getdata(p.pose.body.data) for p in prepared])
+        self.confidence = np.concatenate([p.pose.body.confidence for p in prepared])
+
+        # Letters are shared by all words, so they must never be modified in place
+        self.data.flags.writeable = False
+        self.confidence.flags.writeable = False
+
+        # Junctions depend on how both letters are trimmed. Inside a word, letters are trimmed at both ends,
+        # except the first letter, which is not trimmed at its start.
+        first_letters = [self.trimmed_letter(letter, start=False) for letter in self.letters]
+        middle_letters = [self.trimmed_letter(letter, start=True) for letter in self.letters]
+        self.junctions = np.stack(
+            [
+                find_connection_table(first_letters, middle_letters),
+                find_connection_table(middle_letters, middle_letters),
+            ]
+        )
+
+        # The last letter of a word is stretched, so it and its junctions are prepared on first use
+        self.last_letters: dict[str, PreparedPose] = {}
+        self.last_junctions: dict[tuple[str, bool, str], tuple[int, int]] = {}
+        self.lock = threading.Lock()
+
+    def _segment(self, word: str) -> tuple[str, ...]:
+        # Walks the trie from every position, taking the longest letter that starts there (e.g. "sch" over "s")
+        letters = []
+        position = 0
+        while position < len(word):
+            node = self.trie
+            match = None
+            for i in range(position, len(word)):
+                node = node.get(word[i])
+                if node is None:
+                    break
+                if TRIE_LETTER in node:
+                    match = node[TRIE_LETTER]
+
+            if match is None:
+                end = position + 1
+                while end < len(word) and word[end] not in self.trie:
+                    end += 1
+                raise FileNotFoundError(f"Characters {word[position:end]} not found in fingerspelling lexicon")
+
+            letters.append(match)
+            position += len(match)
+        return tuple(letters)
+
+    def __contains__(self, letter: str) -> bool:
+        return letter in self.letter_indexes
+
+    def prepared_letter(self, letter: str) -> PreparedPose:
+        i = self.letter_indexes[letter]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        # The body masks its data based on the confidence, like every pose read from a file
+        body = NumPyPoseBody(fps=self.fps[i], data=self.data[start:end], confidence=self.confidence[start:end])
+        return PreparedPose(pose=Pose(self.headers[i], body), boundary=self.boundaries[i])
+
+    def trimmed_letter(self, letter: str, start: bool, end=True) -> Pose:
+        pose, boundary = self.prepared_letter(letter)
+        first_frame, last_frame = trim_frames(pose, boundary, start, end)
+        return Pose(pose.header, pose.body[first_frame:last_frame])
+
+    def last_letter(self, letter: str) -> PreparedPose:
+        with self.lock:
+            if letter not in self.last_letters:
+                # hold the last letters longer to make it more readable
+                pose = self.stretch(self.get_pose(self.rows[letter][0]), 2)
+                self.last_letters[letter] = prepare_pose(pose)
+            return self.last_letters[letter]
+
+    def junction(self, letter: str, next_letter: str, is_first: bool, next_is_last: bool) -> tuple[int, int]:
+        if not next_is_last:
+            end, start = self.junctions[
+                0 if is_first else 1, self.letter_indexes[letter], self.letter_indexes[next_letter]
+            ]
+            return int(end), int(start)
+
+        key = (letter, is_first, next_letter)
+        # Prepared before taking the lock, which `last_letter` takes as well
+        last_pose, boundary = self.last_letter(next_letter)
+        with self.lock:
+            if key not in self.last_junctions:
+                pose = self.trimmed_letter(letter, start=not is_first)
+                first_frame, last_frame = trim_frames(last_pose, boundary, True, False)
+                [junction] = find_best_connection_points(
+                    [pose, Pose(last_pose.header, last_pose.body[first_frame:last_frame])]
+                )
+                self.last_junctions[key] = junction
+            return self.last_junctions[key]
+
 
 class FingerspellingPoseLookup(CSVPoseLookup):
-    def __init__(self):
+    def __init__(self, executor: Optional[Executor] = None):
+        # Optional executor, to prepare the letters of an alphabet in parallel
+        self.executor = executor
+
         fs_directory = Path(__file__).parent.parent.parent / "assets" / "fingerspelling_lexicon"
 
         super().__init__(directory=str(fs_directory))
 
-        # Precompute the sorted alphabets to make the lookup faster
-        self.alphabets = {
-            spoken_language: {
-                signed_language: sorted(si_values.keys(), key=len, reverse=True)
-                for signed_language, si_values in sp_values.items()
-            }
-            for spoken_language, sp_values in self.words_index.items()
-        }
-
-    def characters_lookup(self, word: str, spoken_language: str, signed_language: str):
-        if word != "":
-            rows = self.words_index[spoken_language][signed_language]
-            alphabet = self.alphabets[spoken_language][signed_language]
-            found = False
-            for key in alphabet:
-                if key in word:
-                    found = True
-                    match_index = word.index(key)
-
-                    yield from self.characters_lookup(word[:match_index], spoken_language, signed_language)
-                    yield self.get_pose(rows[key][0])
-                    yield from self.characters_lookup(word[match_index + len(key) :], spoken_language, signed_language)
-                    break
+        # Alphabets are loaded on their first request, so a single language does not pay for all others
+        self.alphabets: dict[tuple[str, str], FingerspellingAlphabet] = {}
+        self.alphabets_lock = threading.Lock()
 
-            if not found:
-                raise FileNotFoundError(f"Characters {word} not found in fingerspelling lexicon")
+    def get_alphabet(self, spoken_language: str, signed_language: str) -> FingerspellingAlphabet:
+        key = (spoken_language, signed_language)
+        with self.alphabets_lock:
+            if key not in self.alphabets:
+                if spoken_language not in self.words_index or signed_language not in self.words_index[spoken_language]:
+                    raise FileNotFoundError(
+                        f"Language pair {spoken_language} -> {signed_language} not supported for fingerspelling"
+                    )
+
+                rows = self.words_index[spoken_language][signed_language]
+                self.alphabets[key] = FingerspellingAlphabet(rows, self.get_pose, self.stretch_pose, self.executor)
+            return self.alphabets[key]
+
+    def split_letters(self, word: str, alphabet: FingerspellingAlphabet) -> tuple[str, ...]:
+        return alphabet.segment(word)
 
     def stretch_pose(self, pose: Pose, by: float) -> Pose:
         fps = pose.body.fps
@@ -45,17 +180,18 @@ class FingerspellingPoseLookup(CSVPoseLookup):
         pose.body.fps = fps
         return pose
 
-    def lookup(
+    def lookup_uncached(
         self, word: str, gloss: str, spoken_language: str, signed_language: str, source: str = None
     ) -> PoseResult:
-        if spoken_language not in self.words_index or signed_language not in self.words_index[spoken_language]:
-            raise FileNotFoundError(
-                f"Language pair {spoken_language} -> {signed_language} not supported for fingerspelling"
-            )
-
-        poses = list(self.characters_lookup(word.lower(), spoken_language, signed_language))
+        alphabet = self.get_alphabet(spoken_language, signed_language)
 
-        # hold the last letters longer to make it more readable
-        poses[-1] = self.stretch_pose(poses[-1], 2)
+        # Words are assembled from prepared letters and precomputed junctions, without searching for joins
+        letters = self.split_letters(word.lower(), alphabet)
+        prepared_poses = [alphabet.prepared_letter(letter) for letter in letters[:-1]]
+        prepared_poses.append(alphabet.last_letter(letters[-1]))
+        junctions = [
+            alphabet.junction(letter, next_letter, i == 0, i == len(letters) - 2)
+            for i, (letter, next_letter) in enumerate(zip(letters, letters[1:]))
+        ]
 
-        return PoseResult(pose=concatenate_poses(poses))
+        return PoseResult(pose=concatenate_prepared_poses(prepared_poses, junctions))
@@ -1,22 +1,76 @@
+import copy
+import functools
 import math
 import os
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
-from typing import NamedTuple
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cached_property
+from typing import NamedTuple, Optional
 
 from pose_format import Pose
 
 from spoken_to_signed.gloss_to_pose.languages import LANGUAGE_BACKUP
-from spoken_to_signed.gloss_to_pose.lookup.lru_cache import LRUCache
+from spoken_to_signed.gloss_to_pose.lookup.disk_cache import PoseDiskCache
+from spoken_to_signed.gloss_to_pose.lookup.pose_store import PoseStore, has_pose_store
+from spoken_to_signed.gloss_to_pose.lookup.result_cache import LookupResultCache, own_result
+from spoken_to_signed.lru_cache import LRUCache
 from spoken_to_signed.text_to_gloss.types import Gloss
 
 
 class PoseResult(NamedTuple):
     pose: Pose
+    # Identifies the lexicon entry the pose was read from, None for composed poses (e.g. fingerspelling)
+    key: Optional[str] = None
+
+
+class PlannedLookup(NamedTuple):
+    word: str
+    gloss: str
+    spoken_language: str
+    signed_language: str
+    source: Optional[str]
+    # The language the sign is taken from, which differs from the requested one after a language backup
+    lexicon_language: str
+    row: Optional[dict] = None
+    # Whether the backup lookup (e.g. fingerspelling) is used, when no row was found
+    use_backup: bool = False
+
+    @property
+    def lookup_key(self) -> tuple:
+        return self.word, self.gloss, self.spoken_language, self.signed_language, self.source
+
+
+class LookupPlan(NamedTuple):
+    glosses: Gloss
+    # One resolved lookup per non-empty word, in order
+    lookups: list[PlannedLookup]
+
+
+def row_frames(row: dict, fps: float) -> slice:
+    # Rows are delimited in milliseconds, with an end of 0 to read until the end of the file
+    frame_time = 1000 / fps
+    start_frame = math.floor(row["start"] // frame_time)
+    end_frame = math.ceil(row["end"] // frame_time) if row["end"] > 0 else -1
+    return slice(start_frame, end_frame)
+
+
+@functools.cache
+def shared_executor() -> ThreadPoolExecutor:
+    # One long-lived pool serves the loads of all lookups, instead of a new pool for every sentence
+    return ThreadPoolExecutor(thread_name_prefix="pose-lookup")
 
 
 class PoseLookup:
-    def __init__(self, rows: list, directory: str = None, backup: "PoseLookup" = None, cache: LRUCache = None):
+    def __init__(
+        self,
+        rows: list,
+        directory: str = None,
+        backup: "PoseLookup" = None,
+        cache: LRUCache = None,
+        result_cache: LookupResultCache = None,
+        disk_cache: PoseDiskCache = None,
+    ):
         self.directory = directory
 
         self.words_index = self.make_dictionary_index(rows, based_on="words")
@@ -26,6 +80,17 @@ class PoseLookup:
 
         self.file_systems = {}
         self.cache = cache if cache is not None else LRUCache()
+        self.result_cache = result_cache if result_cache is not None else LookupResultCache()
+        # Remote pose files are kept on local disk when given, and downloaded again by every process otherwise
+        self.disk_cache = disk_cache
+
+    def with_backup(self, backup: "PoseLookup") -> "PoseLookup":
+        # A shallow copy, sharing the indexes and caches of this lookup
+        lookup = copy.copy(self)
+        lookup.backup = backup
+        # Results (and misses) depend on the backup, so they are cached separately
+        lookup.result_cache = self.result_cache.empty_copy()
+        return lookup
 
     def make_dictionary_index(self, rows: list, based_on: str):
         # As an attempt to make the index more compact in memory, we store a dictionary with only what we need
@@ -46,13 +111,9 @@ class PoseLookup:
 
     def read_pose(self, pose_path: str):
         if pose_path.startswith("gs://"):
-            if "gcs" not in self.file_systems:
-                import gcsfs
-
-                self.file_systems["gcs"] = gcsfs.GCSFileSystem(anon=True)
-
-            with self.file_systems["gcs"].open(pose_path, "rb") as f:
-                return Pose.read(f.read())
+            if self.disk_cache is not None:
+                return self.disk_cache.get_or_fetch(pose_path, self.read_gcs_pose)
+            return self.read_gcs_pose(pose_path)
 
         if pose_path.startswith("https://"):
             raise NotImplementedError("Can't access pose files from https endpoint")
@@ -64,18 +125,47 @@ class PoseLookup:
         with open(pose_path, "rb") as f:
             return Pose.read(f.read())
 
+    def read_gcs_pose(self, pose_path: str):
+        if "gcs" not in self.file_systems:
+            import gcsfs
+
+            self.file_systems["gcs"] = gcsfs.GCSFileSystem(anon=True)
+
+        with self.file_systems["gcs"].open(pose_path, "rb") as f:
+            return Pose.read(f.read())
+
+    @cached_property
+    def pose_store(self) -> Optional[PoseStore]:
+        # Packed lexicons are opened lazily, on the first pose read
+        if self.directory is not None and has_pose_store(self.directory):
+            return PoseStore(self.directory)
+        return None
+
     def get_pose(self, row):
-        # Manage pose cache
-        cached_pose = self.cache.get(row["path"])
-        if cached_pose is None:
-            pose = self.read_pose(row["path"])
-            self.cache.set(row["path"], pose)
-        pose = self.cache.get(row["path"])
-
-        frame_time = 1000 / pose.body.fps
-        start_frame = math.floor(row["start"] // frame_time)
-        end_frame = math.ceil(row["end"] // frame_time) if row["end"] > 0 else -1
-        return Pose(pose.header, pose.body[start_frame:end_frame])
+        if self.pose_store is not None and row["path"] in self.pose_store:
+            # Packed poses are read from their memory-mapped store, copying only the frames of the row
+            frames = row_frames(row, self.pose_store.fps(row["path"]))
+            return self.pose_store.read_pose(row["path"], frames)
+
+        # Concurrent requests for the same path share a single read
+        pose = self.cache.get_or_load(row["path"], self.read_pose)
+        return Pose(pose.header, pose.body[row_frames(row, pose.body.fps)])
+
+    def row_key(self, row) -> str:
+        return "|".join([self.directory or "", row["path"], str(row["start"]), str(row["end"])])
+
+    def entry_key(self, row) -> str:
+        # The row and the version of its file, so that poses prepared from an older download are not reused
+        return f"{self.row_key(row)}|{self.file_version(row['path'])}"
+
+    def file_version(self, pose_path: str) -> str:
+        if self.pose_store is not None and pose_path in self.pose_store:
+            return self.pose_store.version
+        if "://" in pose_path or self.directory is None:
+            # Remote files are identified by their URL alone, like in PoseDiskCache
+            return ""
+        stat = os.stat(os.path.join(self.directory, pose_path))
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
 
     def get_best_row(self, rows, term: str):
         # Sort by priority: lower is "better"
@@ -87,52 +177,138 @@ class PoseLookup:
         # Return the highest priority row
         return rows[0]
 
+    def language_pairs(self) -> list[tuple[str, str]]:
+        return [
+            (spoken_language, signed_language)
+            for spoken_language, sp_values in self.words_index.items()
+            for signed_language in sp_values.keys()
+        ]
+
+    def get_rows(self, based_on: str, spoken_language: str, signed_language: str, term: str) -> Optional[list]:
+        dict_index = self.words_index if based_on == "words" else self.glosses_index
+        if spoken_language in dict_index:
+            if signed_language in dict_index[spoken_language]:
+                lower_term = term.lower()
+                if lower_term in dict_index[spoken_language][signed_language]:
+                    return dict_index[spoken_language][signed_language][lower_term]
+        return None
+
     def lookup(
         self, word: str, gloss: str, spoken_language: str, signed_language: str, source: str = None
     ) -> PoseResult:
+        return self.result_cache.get_or_lookup(
+            (word, gloss, spoken_language, signed_language, source),
+            lambda: self.lookup_uncached(word, gloss, spoken_language, signed_language, source),
+        )
+
+    def lookup_uncached(
+        self, word: str, gloss: str, spoken_language: str, signed_language: str, source: str = None
+    ) -> PoseResult:
+        return self.load(self.resolve(word, gloss, spoken_language, signed_language, source))
+
+    def resolve(
+        self, word: str, gloss: str, spoken_language: str, signed_language: str, source: str = None
+    ) -> PlannedLookup:
         lookup_list = [
-            (self.words_index, (spoken_language, signed_language, word)),
-            (self.glosses_index, (spoken_language, signed_language, word)),
-            (self.glosses_index, (spoken_language, signed_language, gloss)),
+            ("words", word),
+            ("glosses", word),
+            ("glosses", gloss),
         ]
 
-        for dict_index, (spoken_language, signed_language, term) in lookup_list:
-            if spoken_language in dict_index:
-                if signed_language in dict_index[spoken_language]:
-                    lower_term = term.lower()
-                    if lower_term in dict_index[spoken_language][signed_language]:
-                        rows = dict_index[spoken_language][signed_language][lower_term]
-                        return PoseResult(pose=self.get_pose(self.get_best_row(rows, term)))
+        lexicon_language = signed_language
+        while True:
+            for based_on, term in lookup_list:
+                rows = self.get_rows(based_on, spoken_language, lexicon_language, term)
+                if rows is not None:
+                    row = self.get_best_row(rows, term)
+                    return PlannedLookup(word, gloss, spoken_language, signed_language, source, lexicon_language, row)
 
-        # Backup strategy: revert to backup sign language
-        if signed_language in LANGUAGE_BACKUP:
-            return self.lookup(word, gloss, spoken_language, LANGUAGE_BACKUP[signed_language], source)
+            # Backup strategy: revert to backup sign language
+            if lexicon_language not in LANGUAGE_BACKUP:
+                break
+            lexicon_language = LANGUAGE_BACKUP[lexicon_language]
 
         # Backup strategy: revert to fingerspelling
-        if self.backup is not None:
-            return self.backup.lookup(word, gloss, spoken_language, signed_language, source)
+        return PlannedLookup(
+            word, gloss, spoken_language, signed_language, source, lexicon_language, use_backup=self.backup is not None
+        )
+
+    def load(self, planned: PlannedLookup) -> PoseResult:
+        if planned.row is not None:
+            return PoseResult(pose=self.get_pose(planned.row), key=self.entry_key(planned.row))
+
+        if planned.use_backup:
+            return self.backup.lookup(
+                planned.word, planned.gloss, planned.spoken_language, planned.lexicon_language, planned.source
+            )
 
         raise FileNotFoundError
 
-    def lookup_sequence(
-        self, glosses: Gloss, spoken_language: str, signed_language: str, source: str = None
-    ) -> list[PoseResult]:
-        def lookup_pair(pair):
-            word, gloss = pair
-            if word == "":
-                return None
+    def load_key(self, planned: PlannedLookup) -> tuple:
+        # Lookups resolved to the same row read the same pose, whatever word they were resolved from
+        if planned.row is not None:
+            return ("row", self.row_key(planned.row))
+        return planned.lookup_key
+
+    def plan(self, glosses: Gloss, spoken_language: str, signed_language: str, source: str = None) -> LookupPlan:
+        lookups = [
+            self.resolve(word, gloss, spoken_language, signed_language, source) for word, gloss in glosses if word != ""
+        ]
+        return LookupPlan(glosses=glosses, lookups=lookups)
+
+    def submit_plans(self, plans: list[LookupPlan]) -> list[list[Future]]:
+        # Every distinct load starts right away on the shared pool, and runs once for all plans
+        groups: dict[tuple, list[PlannedLookup]] = {}
+        for plan in plans:
+            for planned in plan.lookups:
+                groups.setdefault(self.load_key(planned), []).append(planned)
+
+        loads: dict[tuple, Future] = {}
+        for key, planned_lookups in groups.items():
+            planned = planned_lookups[0]
+            # The result is cached under every word and gloss resolved to the same row, not only the first one
+            aliases = list(
+                dict.fromkeys(p.lookup_key for p in planned_lookups[1:] if p.lookup_key != planned.lookup_key)
+            )
+            loads[key] = shared_executor().submit(
+                self.result_cache.get_or_lookup_shared,
+                planned.lookup_key,
+                functools.partial(self.load, planned),
+                aliases,
+            )
+
+        return [[loads[self.load_key(planned)] for planned in plan.lookups] for plan in plans]
 
+    def iter_results(self, plan: LookupPlan, futures: list[Future]) -> Iterator[PoseResult]:
+        found = False
+        for future in futures:
             try:
-                return self.lookup(word, gloss, spoken_language, signed_language)
+                result = future.result()
             except FileNotFoundError as e:
                 print(e)
-                return None
+                continue
 
-        with ThreadPoolExecutor() as executor:
-            results = [r for r in executor.map(lookup_pair, glosses) if r is not None]
+            found = True
+            # Repeated signs share their arrays, but every occurrence gets its own pose
+            yield own_result(result)
 
-        if len(results) == 0:
-            gloss_sequence = " ".join([f"{word}/{gloss}" for word, gloss in glosses])
+        if not found:
+            gloss_sequence = " ".join([f"{word}/{gloss}" for word, gloss in plan.glosses])
             raise Exception(f"No poses found for {gloss_sequence}")
 
-        return results
+    def execute_plans(self, plans: list[LookupPlan]) -> list[list[PoseResult]]:
+        futures = self.submit_plans(plans)
+        return [list(self.iter_results(plan, plan_futures)) for plan, plan_futures in zip(plans, futures)]
+
+    def lookup_sequence(
+        self, glosses: Gloss, spoken_language: str, signed_language: str, source: str = None
+    ) -> list[PoseResult]:
+        return list(self.iter_lookup_sequence(glosses, spoken_language, signed_language, source))
+
+    def iter_lookup_sequence(
+        self, glosses: Gloss, spoken_language: str, signed_language: str, source: str = None
+    ) -> Iterator[PoseResult]:
+        # All loads start right away, but results are yielded in order as soon as they are ready
+        plan = self.plan(glosses, spoken_language, signed_language, source)
+        [futures] = self.submit_plans([plan])
+        return self.iter_results(plan, futures)
@@ -1,23 +1,4 @@
-from collections import OrderedDict
+# The cache is shared with text_to_gloss, which must not import the pose stack, so it lives at the package root
+from spoken_to_signed.lru_cache import CacheStats, LRUCache, default_sizeof
 
-
-class LRUCache:
-    def __init__(self, maxsize=100):
-        self.cache = OrderedDict()
-        self.maxsize = maxsize
-
-    def get(self, key):
-        if key in self.cache:
-            # Move the accessed item to the end to show it's recently used
-            self.cache.move_to_end(key)
-            return self.cache[key]
-        return None
-
-    def set(self, key, value):
-        if key in self.cache:
-            # Move the accessed item to the end to show it's recently used
-            self.cache.move_to_end(key)
-        elif len(self.cache) >= self.maxsize:
-            # Remove the first (least recently used) item
-            self.cache.popitem(last=False)
-        self.cache[key] = value
+__all__ = ["CacheStats", "LRUCache", "default_sizeof"]
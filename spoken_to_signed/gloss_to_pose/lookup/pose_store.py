@@ -0,0 +1,137 @@
+import csv
+import os
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+from pose_format import Pose, PoseHeader
+from pose_format.numpy import NumPyPoseBody
+from pose_format.utils.reader import BufferReader
+
+from .directory import replacing_directory
+from .string_table import StringTable, write_string_table
+
+POSE_STORE_DIRECTORY = "poses.packed"
+
+ENTRY_DTYPE = np.dtype(
+    [
+        ("header", np.int32),
+        ("fps", np.float64),
+        ("frames", np.int64),
+        ("people", np.int64),
+        ("points", np.int64),
+        ("dims", np.int64),
+        ("data_offset", np.int64),
+        ("confidence_offset", np.int64),
+    ]
+)
+
+
+def pose_store_path(directory: str) -> str:
+    return os.path.join(directory, POSE_STORE_DIRECTORY)
+
+
+def has_pose_store(directory: str) -> bool:
+    # A pose store older than index.csv may be missing entries, and should not be used
+    index_path = os.path.join(directory, "index.csv")
+    marker_path = os.path.join(pose_store_path(directory), "entries.npy")
+    if not os.path.isfile(marker_path):
+        return False
+    return not os.path.isfile(index_path) or os.path.getmtime(marker_path) >= os.path.getmtime(index_path)
+
+
+def pack_poses(directory: str):
+    with open(os.path.join(directory, "index.csv"), encoding="utf-8") as f:
+        # Remote poses are not packed, they are still read through the lookup's file systems
+        paths = sorted({row["path"] for row in csv.DictReader(f) if "://" not in row["path"]})
+
+    with replacing_directory(pose_store_path(directory)) as store_directory:
+        headers = {}
+        entries = np.zeros(len(paths), dtype=ENTRY_DTYPE)
+        data_offset = confidence_offset = 0
+
+        # Pose bodies are appended to two flat float32 files, one for the data and one for the confidence
+        data_path = os.path.join(store_directory, "data.f32")
+        confidence_path = os.path.join(store_directory, "confidence.f32")
+        with open(data_path, "wb") as data_file, open(confidence_path, "wb") as confidence_file:
+            for i, path in enumerate(paths):
+                with open(os.path.join(directory, path), "rb") as f:
+                    pose = Pose.read(f.read())
+
+                header_buffer = BytesIO()
+                pose.header.write(header_buffer)
+                header_bytes = header_buffer.getvalue()
+                if header_bytes not in headers:
+                    headers[header_bytes] = len(headers)
+
+                data = np.asarray(np.ma.getdata(pose.body.data), dtype=np.float32)
+                confidence = np.asarray(pose.body.confidence, dtype=np.float32)
+                data_file.write(data.tobytes())
+                confidence_file.write(confidence.tobytes())
+
+                entries[i] = (headers[header_bytes], pose.body.fps, *data.shape, data_offset, confidence_offset)
+                data_offset += data.size
+                confidence_offset += confidence.size
+
+        write_string_table(store_directory, "paths", [path.encode() for path in paths])
+        write_string_table(store_directory, "headers", list(headers))
+
+        # Written last, as its presence marks the store as complete
+        np.save(os.path.join(store_directory, "entries.npy"), entries)
+
+    print(f"Packed {len(paths)} poses to {pose_store_path(directory)}")
+
+
+def _memory_map(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    # Read-only, poses are copied out of the store when they are read
+    return np.memmap(path, dtype=np.float32, mode="r")
+
+
+class PoseStore:
+    """Memory-mapped pose bodies written by `pack_poses`. Only the frames that are read are copied out."""
+
+    def __init__(self, directory: str):
+        store_directory = pose_store_path(directory)
+        entries_path = os.path.join(store_directory, "entries.npy")
+        self.entries = np.load(entries_path, mmap_mode="r")
+        # Packing replaces the whole store, so the time its entries were written identifies its contents
+        self.version = str(os.stat(entries_path).st_mtime_ns)
+        self.paths = StringTable(store_directory, "paths")
+        self.header_buffers = StringTable(store_directory, "headers")
+        self.data = _memory_map(os.path.join(store_directory, "data.f32"))
+        self.confidence = _memory_map(os.path.join(store_directory, "confidence.f32"))
+        self.headers = {}
+
+    def __contains__(self, path: str) -> bool:
+        return self.paths.find(path.encode()) is not None
+
+    def get_header(self, index: int) -> PoseHeader:
+        if index not in self.headers:
+            self.headers[index] = PoseHeader.read(BufferReader(self.header_buffers[index]))
+        return self.headers[index]
+
+    def fps(self, path: str) -> Optional[float]:
+        index = self.paths.find(path.encode())
+        return None if index is None else float(self.entries[index]["fps"])
+
+    def read_pose(self, path: str, frames: slice = slice(None)) -> Optional[Pose]:
+        index = self.paths.find(path.encode())
+        if index is None:
+            return None
+
+        entry = self.entries[index]
+        shape = (int(entry["frames"]), int(entry["people"]), int(entry["points"]))
+        data_size = int(np.prod(shape)) * int(entry["dims"])
+        confidence_size = int(np.prod(shape))
+
+        # Only the requested frames are copied, so that callers can modify them, and the mask is built for them alone
+        data_offset = int(entry["data_offset"])
+        confidence_offset = int(entry["confidence_offset"])
+        data = self.data[data_offset : data_offset + data_size].reshape(*shape, int(entry["dims"]))
+        confidence = self.confidence[confidence_offset : confidence_offset + confidence_size].reshape(shape)
+        data, confidence = np.array(data[frames]), np.array(confidence[frames])
+
+        body = NumPyPoseBody(fps=float(entry["fps"]), data=data, confidence=confidence)
+        return Pose(self.get_header(int(entry["header"])), body)
@@ -0,0 +1,86 @@
+import copy
+import time
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional
+
+import numpy as np
+from pose_format import Pose
+
+from spoken_to_signed.lru_cache import DEFAULT_MAX_BYTES, LRUCache
+
+if TYPE_CHECKING:
+    from spoken_to_signed.gloss_to_pose.lookup.lookup import PoseResult
+
+
+def is_view(array: np.ndarray) -> bool:
+    # Whether the array keeps more memory alive than its own bytes, e.g. a slice of a larger (or mapped) array
+    root = array
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    return root.base is not None or root.nbytes > array.nbytes
+
+
+class CachedMiss(NamedTuple):
+    # The arguments of the FileNotFoundError the lookup ended with
+    args: tuple
+
+
+class LookupResultCache(LRUCache):
+    """
+    Caches whole lookup results by (word, gloss, spoken_language, signed_language, source),
+    including misses, so repeated words skip the index, the language backups and fingerspelling.
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(maxsize=maxsize, max_bytes=max_bytes, ttl=ttl, clock=clock)
+        self.negative_ttl = negative_ttl
+
+    def empty_copy(self) -> "LookupResultCache":
+        return LookupResultCache(self.maxsize, self.max_bytes, self.ttl, self.negative_ttl, self.clock)
+
+    def ttl_for(self, value) -> Optional[float]:
+        return self.negative_ttl if isinstance(value, CachedMiss) else self.ttl
+
+    def get_or_lookup(self, key: tuple, lookup: Callable[[], "PoseResult"]) -> "PoseResult":
+        return own_result(self.get_or_lookup_shared(key, lookup))
+
+    def get_or_lookup_shared(
+        self, key: tuple, lookup: Callable[[], "PoseResult"], aliases: Iterable[tuple] = ()
+    ) -> "PoseResult":
+        """
+        Looks up the result once, and also caches it under `aliases`, other keys known to have the same result.
+        The result is shared with the cache, so callers must pass it through `own_result` before using its pose.
+        """
+
+        def load(_):
+            try:
+                result = lookup()
+            except FileNotFoundError as e:
+                return CachedMiss(e.args)
+            # Lexicon poses are frame slices of whole files, which would otherwise stay alive through this cache,
+            # long after the pose cache evicted them, and without being counted in its bytes
+            if is_view(result.pose.body.confidence):
+                return result._replace(pose=result.pose.copy())
+            return result
+
+        result = self.get_or_load(key, load)
+        with self.lock:
+            for alias in aliases:
+                if self._get(alias) is None:
+                    self._set(alias, result)
+
+        if isinstance(result, CachedMiss):
+            raise FileNotFoundError(*result.args)
+        return result
+
+
+def own_result(result: "PoseResult") -> "PoseResult":
+    # Callers may replace the body of the pose (e.g. when padding it), so every caller gets its own, sharing the arrays
+    return result._replace(pose=Pose(result.pose.header, copy.copy(result.pose.body)))
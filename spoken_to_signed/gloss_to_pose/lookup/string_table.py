@@ -0,0 +1,35 @@
+import bisect
+import os
+from typing import Optional
+
+import numpy as np
+
+
+def write_string_table(directory: str, name: str, strings: list[bytes]):
+    # Strings are stored back to back in one byte array, with an offsets array marking their boundaries
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+    np.save(os.path.join(directory, f"{name}_data.npy"), np.frombuffer(b"".join(strings), dtype=np.uint8))
+
+
+class StringTable:
+    """A memory-mapped, read-only list of byte strings written by `write_string_table`."""
+
+    def __init__(self, directory: str, name: str):
+        self.offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"), mmap_mode="r")
+        self.data = np.load(os.path.join(directory, f"{name}_data.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return self.data[self.offsets[index] : self.offsets[index + 1]].tobytes()
+
+    def find(self, value: bytes) -> Optional[int]:
+        # Binary search, only valid for tables written in sorted order
+        index = bisect.bisect_left(self, value)
+        if index < len(self) and self[index] == value:
+            return index
+        return None
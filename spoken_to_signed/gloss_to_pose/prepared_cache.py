@@ -0,0 +1,67 @@
+import hashlib
+import os
+from typing import Optional
+
+import numpy as np
+from pose_format import Pose
+
+from spoken_to_signed.lru_cache import LRUCache
+
+from .concatenate import ConcatenationSettings, PreparedPose, SigningBoundary, prepare_pose
+from .lookup import PoseResult
+from .lookup.disk_cache import pose_from_arrays, pose_to_arrays, save_arrays
+
+# Bump whenever `prepare_pose` changes, to invalidate entries persisted by older versions
+PREPARATION_VERSION = 1
+
+
+def write_prepared_pose(path: str, prepared: PreparedPose):
+    pose, boundary = prepared
+    boundary = np.array([] if boundary is None else list(boundary), dtype=np.int64)
+    save_arrays(path, **pose_to_arrays(pose), boundary=boundary)
+
+
+def read_prepared_pose(path: str) -> PreparedPose:
+    with np.load(path) as f:
+        pose = pose_from_arrays(f)
+        boundary = SigningBoundary(*f["boundary"].tolist()) if len(f["boundary"]) > 0 else None
+    return PreparedPose(pose=pose, boundary=boundary)
+
+
+class PreparedPoseCache:
+    """
+    Caches reduced, normalized and trim-analyzed lexicon poses, in memory and optionally on disk.
+    Entries are keyed by the lexicon entry and the version of its file (see `PoseLookup.entry_key`),
+    and by `PREPARATION_VERSION`, so that neither a new download of the lexicon nor a change to `prepare_pose`
+    reuses stale entries. Remote pose files are only identified by their URL.
+    """
+
+    def __init__(self, directory: Optional[str] = None, memory: LRUCache = None):
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.memory = memory if memory is not None else LRUCache()
+
+    def cache_key(self, key: str) -> str:
+        settings = f"v{PREPARATION_VERSION}|reduce_holistic={ConcatenationSettings.is_reduce_holistic}"
+        return hashlib.sha1(f"{settings}|{key}".encode()).hexdigest()
+
+    def prepare(self, result: PoseResult) -> PreparedPose:
+        # Poses that do not come from a single lexicon entry can not be identified, so they are not cached
+        if result.key is None:
+            return prepare_pose(result.pose)
+
+        return self.memory.get_or_load(self.cache_key(result.key), lambda key: self.load(key, result.pose))
+
+    def load(self, key: str, pose: Pose) -> PreparedPose:
+        if self.directory is None:
+            return prepare_pose(pose)
+
+        path = os.path.join(self.directory, f"{key}.npz")
+        if os.path.isfile(path):
+            return read_prepared_pose(path)
+
+        prepared = prepare_pose(pose)
+        write_prepared_pose(path, prepared)
+        return prepared
@@ -1,28 +1,31 @@
 import math
+from typing import Optional
 
 import numpy as np
-import scipy.signal
+import numpy.ma as ma
 from pose_format import Pose
 from pose_format.numpy import NumPyPoseBody
-from scipy.spatial.distance import cdist
 
 
-def pose_savgol_filter(pose: Pose):
-    # If we want this to be faster, here is a possible solution
-    # https://stackoverflow.com/questions/75221888/fast-savgol-filter-on-3d-tensor/75406720#75406720
-
-    # Smoothing the face does not result in a good result, so we skip it
+def face_points_mask(pose: Pose) -> np.ndarray:
+    # Smoothing the face does not result in a good result, so we mark its points to be skipped
     [face_component] = [c for c in pose.header.components if c.name == "FACE_LANDMARKS"]
-    face_range = range(
-        pose.header._get_point_index("FACE_LANDMARKS", face_component.points[0]),
-        pose.header._get_point_index("FACE_LANDMARKS", face_component.points[-1]),
-    )
+    face_start = pose.header._get_point_index("FACE_LANDMARKS", face_component.points[0])
+    face_end = pose.header._get_point_index("FACE_LANDMARKS", face_component.points[-1])
+
+    mask = np.zeros(pose.body.data.shape[2], dtype=bool)
+    mask[face_start:face_end] = True
+    return mask
+
 
-    _, _, points, dims = pose.body.data.shape
-    for p in range(points):
-        if p not in face_range:
-            for d in range(dims):
-                pose.body.data[:, 0, p, d] = scipy.signal.savgol_filter(pose.body.data[:, 0, p, d], 3, 1)
+def pose_savgol_filter(pose: Pose, window_length=3, polyorder=1):
+    # scipy.signal is slow to import, and only needed once poses are smoothed
+    import scipy.signal
+
+    # Filter all non-face points of all people along the time axis, in a single batched call
+    smoothed_points = ~face_points_mask(pose)
+    data = ma.getdata(pose.body.data)[:, :, smoothed_points]
+    pose.body.data[:, :, smoothed_points] = scipy.signal.savgol_filter(data, window_length, polyorder, axis=0)
     return pose
 
 
@@ -55,10 +58,207 @@ def concatenate_poses(poses: list[Pose], padding: NumPyPoseBody, interpolation="
     return Pose(header=poses[0].header, body=new_body)
 
 
-def find_best_connection_point(pose1: Pose, pose2: Pose, window=0.3):
+def _interpolate_junction(data: np.ndarray, confidence: np.ndarray, start: int, gap_start: int, gap_end: int, end: int):
+    """
+    Linearly interpolates, in place, every point between its last frame before the gap and its first frame after it.
+    Only frames of the two segments around the gap (`start` to `end`) are searched for these frames.
+    """
+    valid = confidence[start:end] > 0
+    before, after = valid[: gap_start - start], valid[gap_end - start :]
+    known = before.any(axis=0) & after.any(axis=0)  # (people, points)
+    if not np.any(known):
+        return
+
+    last_before = gap_start - 1 - np.argmax(before[::-1], axis=0)
+    first_after = gap_end + np.argmax(after, axis=0)
+    first_frame, last_frame = last_before[known].min(), first_after[known].max()
+
+    people, points = np.indices(known.shape)
+    frames = np.arange(first_frame, last_frame + 1)[:, np.newaxis, np.newaxis]
+    weights = (frames - last_before) / (first_after - last_before)
+    inside = known & (frames > last_before) & (frames < first_after)
+
+    for values in [data, confidence]:
+        first_values, last_values = values[last_before, people, points], values[first_after, people, points]
+        weights_shape = weights.reshape(weights.shape + (1,) * (values.ndim - 3))
+        interpolated = first_values + (last_values - first_values) * weights_shape
+        window = values[first_frame : last_frame + 1]
+        window[inside] = interpolated[inside]
+
+
+def join_segments(segments: list[Pose], padding: NumPyPoseBody, window_length=3, polyorder=1) -> Pose:
+    """
+    Joins segments with padding between them, like `concatenate_poses` followed by `pose_savgol_filter`,
+    but only interpolates and smooths around each junction.
+    Frames further than half the filter window from a junction are copied through unchanged.
+    """
+    # scipy.signal is slow to import, and only needed once poses are smoothed
+    import scipy.signal
+
+    gap = len(padding.data)
+    data_parts, confidence_parts, junctions = [], [], []
+    frame = 0
+    for i, segment in enumerate(segments):
+        data_parts.append(ma.getdata(segment.body.data))
+        confidence_parts.append(segment.body.confidence)
+        if i < len(segments) - 1:
+            data_parts.append(padding.data)
+            confidence_parts.append(padding.confidence)
+            junctions.append((frame, frame + len(segment.body.data), frame + len(segment.body.data) + gap))
+            frame += len(segment.body.data) + gap
+
+    data = np.concatenate(data_parts)
+    confidence = np.concatenate(confidence_parts)
+
+    for i, (start, gap_start, gap_end) in enumerate(junctions):
+        end = junctions[i + 1][1] if i + 1 < len(junctions) else len(data)
+        _interpolate_junction(data, confidence, start, gap_start, gap_end, end)
+
+    # Like `pose_savgol_filter`, the face is not smoothed. All windows are filtered before any is written back.
+    smoothed_points = ~face_points_mask(segments[0])
+    half_window = window_length // 2
+    filtered = []
+    for _, gap_start, gap_end in junctions:
+        first_frame, last_frame = max(gap_start - half_window, 0), min(gap_end + half_window, len(data))
+        context_start, context_end = max(first_frame - half_window, 0), min(last_frame + half_window, len(data))
+        if context_end - context_start < window_length:
+            continue
+        context = data[context_start:context_end][:, :, smoothed_points]
+        window = scipy.signal.savgol_filter(context, window_length, polyorder, axis=0)
+        filtered.append((first_frame, last_frame, window[first_frame - context_start : last_frame - context_start]))
+
+    for first_frame, last_frame, window in filtered:
+        data[first_frame:last_frame, :, smoothed_points] = window
+
+    body = NumPyPoseBody(fps=segments[0].body.fps, data=data, confidence=confidence)
+    return Pose(header=segments[0].header, body=body)
+
+
+def connection_window_size(pose: Pose, window: float) -> int:
     # window size in seconds, or percentage of the pose, whichever is smaller
-    p1_size = math.ceil(min(window * pose1.body.fps, len(pose1.body.data) * window))
-    p2_size = math.ceil(min(window * pose2.body.fps, len(pose2.body.data) * window))
+    return math.ceil(min(window * pose.body.fps, len(pose.body.data) * window))
+
+
+def hands_and_upper_body_points(pose: Pose) -> np.ndarray:
+    # The face barely moves between signs, and the legs are mostly out of frame, so they are noise for joining.
+    # Besides the face components, the body has its own head points (e.g. NOSE, LEFT_EYE_INNER, MOUTH_LEFT).
+    ignored_body_points = ("KNEE", "ANKLE", "HEEL", "FOOT_INDEX")
+    head_parts = {"NOSE", "EYE", "EAR", "MOUTH"}
+    indexes = []
+    for component in pose.header.components:
+        if component.name == "POSE_LANDMARKS":
+            points = [
+                p
+                for p in component.points
+                if not any(name in p for name in ignored_body_points) and not head_parts & set(p.split("_"))
+            ]
+        elif "HAND" in component.name:
+            points = component.points
+        else:
+            continue
+        indexes.extend(pose.header._get_point_index(component.name, p) for p in points)
+    return np.array(indexes, dtype=np.int64)
+
+
+def _pca_projection(vectors: np.ndarray, components: int) -> np.ndarray:
+    centered = vectors - vectors.mean(axis=0)
+    _, _, vt = np.linalg.svd(centered, full_matrices=False)
+    return vt[:components].T
+
+
+def find_best_connection_points(
+    poses: list[Pose], window=0.3, features="all", dtype=np.float64, pca_components=16
+) -> list[tuple[int, int]]:
+    """
+    Finds the best junction between every pair of adjacent poses, in one vectorized pass.
+
+    features: "all" compares every point (like `find_best_connection_point`),
+              "hands_body" only compares the hands and upper body, and
+              "pca" compares a `pca_components` dimensional projection of all points.
+    dtype: np.float32 halves the memory and time, but may pick a different frame when two candidates nearly tie.
+    """
+    if len(poses) < 2:
+        return []
+
+    ends = [connection_window_size(pose, window) for pose in poses[:-1]]
+    starts = [connection_window_size(pose, window) for pose in poses[1:]]
+
+    # All poses of a sentence share the same header, so the points are selected once
+    points = hands_and_upper_body_points(poses[0]) if features == "hands_body" else slice(None)
+
+    def window_vectors(pose: Pose, frames: slice) -> np.ndarray:
+        data = ma.getdata(pose.body.data)[frames, :, points]
+        return data.reshape(len(data), -1)
+
+    last_vectors = [window_vectors(pose, slice(len(pose.body.data) - size, None)) for pose, size in zip(poses, ends)]
+    first_vectors = [window_vectors(pose, slice(None, size)) for pose, size in zip(poses[1:], starts)]
+
+    if features == "pca":
+        projection = _pca_projection(np.concatenate(last_vectors + first_vectors), pca_components)
+        last_vectors = [v @ projection for v in last_vectors]
+        first_vectors = [v @ projection for v in first_vectors]
+    elif features not in ("all", "hands_body"):
+        raise ValueError(f"Unknown connection features {features}")
+
+    last_indexes, first_indexes = _best_connections(last_vectors, first_vectors, dtype)
+    return [
+        (len(pose.body.data) - size + int(last_index), int(first_index))
+        for pose, size, last_index, first_index in zip(poses, ends, last_indexes, first_indexes)
+    ]
+
+
+def _best_connections(
+    last_vectors: list[np.ndarray], first_vectors: list[np.ndarray], dtype=np.float64
+) -> tuple[np.ndarray, np.ndarray]:
+    # Pad all windows to the same number of frames, so that all junctions are computed in a single batch
+    pairs, max_end, max_start = len(last_vectors), max(map(len, last_vectors)), max(map(len, first_vectors))
+    dimensions = last_vectors[0].shape[1]
+    last_batch = np.zeros((pairs, max_end, dimensions), dtype=dtype)
+    first_batch = np.zeros((pairs, max_start, dimensions), dtype=dtype)
+    valid = np.zeros((pairs, max_end, max_start), dtype=bool)
+    for i, (last, first) in enumerate(zip(last_vectors, first_vectors)):
+        last_batch[i, : len(last)] = last
+        first_batch[i, : len(first)] = first
+        valid[i, : len(last), : len(first)] = True
+
+    differences = last_batch[:, :, np.newaxis, :] - first_batch[:, np.newaxis, :, :]
+    distances = np.sqrt(np.einsum("pijd,pijd->pij", differences, differences))
+    distances[~valid] = np.inf
+
+    # Padding frames come after the real frames in every row, so ties still resolve to the first real frame
+    min_indexes = np.argmin(distances.reshape(pairs, -1), axis=1)
+    return np.unravel_index(min_indexes, (max_end, max_start))
+
+
+def find_connection_table(ends: list[Pose], starts: list[Pose], window=0.3) -> np.ndarray:
+    """
+    Finds the best junction from every pose in `ends` to every pose in `starts`, comparing all points.
+    Returns an array of shape (len(ends), len(starts), 2), of (end frame, start frame) junctions.
+    """
+    end_sizes = [connection_window_size(pose, window) for pose in ends]
+    start_sizes = [connection_window_size(pose, window) for pose in starts]
+
+    def window_vectors(pose: Pose, frames: slice) -> np.ndarray:
+        data = ma.getdata(pose.body.data)[frames]
+        return data.reshape(len(data), -1)
+
+    first_vectors = [window_vectors(pose, slice(None, size)) for pose, size in zip(starts, start_sizes)]
+
+    # One batch per end pose, to bound the memory of the distance computation
+    table = np.zeros((len(ends), len(starts), 2), dtype=np.int64)
+    for i, (pose, size) in enumerate(zip(ends, end_sizes)):
+        last_vectors = window_vectors(pose, slice(len(pose.body.data) - size, None))
+        last_indexes, first_indexes = _best_connections([last_vectors] * len(starts), first_vectors)
+        table[i, :, 0] = len(pose.body.data) - size + last_indexes
+        table[i, :, 1] = first_indexes
+    return table
+
+
+def find_best_connection_point(pose1: Pose, pose2: Pose, window=0.3):
+    from scipy.spatial.distance import cdist
+
+    p1_size = connection_window_size(pose1, window)
+    p2_size = connection_window_size(pose2, window)
 
     last_data = pose1.body.data[len(pose1.body.data) - p1_size :]
     first_data = pose2.body.data[:p2_size]
@@ -72,18 +272,31 @@ def find_best_connection_point(pose1: Pose, pose2: Pose, window=0.3):
     return last_index, min_index[1]
 
 
-def smooth_concatenate_poses(poses: list[Pose], padding=0.20) -> Pose:
+def smooth_concatenate_poses(
+    poses: list[Pose], padding=0.20, junctions: Optional[list[tuple[int, int]]] = None, smoothing="full"
+) -> Pose:
+    """
+    smoothing: "full" interpolates and smooths the whole concatenation, and
+               "junctions" only the padding and the frames next to it, copying the signs through.
+    """
+    if smoothing not in ("full", "junctions"):
+        raise ValueError(f"Unknown smoothing {smoothing}")
+
     if len(poses) == 0:
         raise ValueError("No poses to smooth")
 
     if len(poses) == 1:
         return poses[0]
 
+    # Junctions may be precomputed, e.g. for the letters of a fingerspelling alphabet
+    if junctions is None:
+        junctions = find_best_connection_points(poses)
+
     start = 0
     for i, pose in enumerate(poses):
         print("Processing", i + 1, "of", len(poses), "...")
         if i != len(poses) - 1:
-            end, next_start = find_best_connection_point(poses[i], poses[i + 1])
+            end, next_start = junctions[i]
         else:
             end = len(pose.body.data)
             next_start = None
@@ -92,6 +305,10 @@ def smooth_concatenate_poses(poses: list[Pose], padding=0.20) -> Pose:
         start = next_start
 
     padding_pose = create_padding(padding, poses[0])
+    if smoothing == "junctions":
+        print("Concatenating and smoothing junctions...")
+        return join_segments(poses, padding_pose)
+
     print("Concatenating...")
     single_pose = concatenate_poses(poses, padding_pose)
     print("Smoothing...")
@@ -0,0 +1,92 @@
+import copy
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+from pose_format import Pose
+from pose_format.numpy import NumPyPoseBody
+from pose_format.utils.generic import correct_wrists, normalize_pose_size
+
+from spoken_to_signed.gloss_to_pose.concatenate import PreparedPose, find_junctions, trim_frames
+from spoken_to_signed.gloss_to_pose.smoothing import (
+    concatenate_poses,
+    create_padding,
+    pose_savgol_filter,
+)
+
+
+def _finish_chunk(chunk: Pose) -> Pose:
+    # Both steps are per-frame, so they give the same result on a chunk as on the whole pose
+    chunk = correct_wrists(chunk)
+    normalize_pose_size(chunk)
+    return chunk
+
+
+def _smooth_segment(previous: Optional[Pose], segment: Pose, following: Optional[Pose], padding: NumPyPoseBody) -> Pose:
+    """
+    Interpolates and smooths a segment (a sign between its two junctions, followed by padding if it is not last),
+    using only the previous segment and the following sign as context.
+    """
+    # `concatenate_poses` pads the bodies it is given, so it gets shallow copies
+    window = [Pose(pose.header, copy.copy(pose.body)) for pose in [previous, segment, following] if pose is not None]
+    smoothed = pose_savgol_filter(concatenate_poses(window, padding))
+
+    first_frame = 0 if previous is None else len(previous.body.data) + len(padding.data)
+    last_frame = first_frame + len(segment.body.data)
+    if following is not None:
+        last_frame += len(padding.data)
+    # Slicing a body masks it again based on the confidence, but smoothing unmasked the points it filtered
+    body = smoothed.body[first_frame:last_frame]
+    body.data = smoothed.body.data[first_frame:last_frame]
+    body.fps = padding.fps
+    return Pose(segment.header, body)
+
+
+def _mark_last(items: Iterable) -> Iterator[tuple[object, bool]]:
+    iterator = iter(items)
+    end = object()
+    current = next(iterator, end)
+    if current is end:
+        return
+    for item in iterator:
+        yield current, False
+        current = item
+    yield current, True
+
+
+def stream_prepared_poses(prepared_poses: Iterable[PreparedPose], padding=0.20) -> Iterator[Pose]:
+    """
+    Like `concatenate_prepared_poses`, but yields the concatenated pose in chunks, one per sign, as soon as the
+    junction after that sign is resolved. Interpolation and smoothing look at most one sign ahead, so the chunks
+    match the full concatenation, except for points that are missing from an entire sign.
+    """
+    current: Optional[Pose] = None
+    padding_body: Optional[NumPyPoseBody] = None
+    previous_segment: Optional[Pose] = None
+    start = 0
+    for i, ((pose, boundary), is_last) in enumerate(_mark_last(prepared_poses)):
+        # The last sign is not trimmed at its end, so every sign is trimmed once the one after it is known
+        first_frame, last_frame = trim_frames(pose, boundary, i > 0, not is_last)
+        pose = Pose(pose.header, pose.body[first_frame:last_frame])
+        if current is None:
+            # Like in `smooth_concatenate_poses`, the first sign determines the padding and frame rate
+            current = pose
+            padding_body = create_padding(padding, pose)
+            continue
+
+        [(end, next_start)] = find_junctions([current, pose])
+        segment = Pose(current.header, current.body[start:end])
+        following = Pose(pose.header, pose.body[next_start:])
+        yield _finish_chunk(_smooth_segment(previous_segment, segment, following, padding_body))
+
+        previous_segment, current, start = segment, pose, next_start
+
+    if current is None:
+        raise ValueError("No poses to concatenate")
+
+    # A single sign is not smoothed at all, like in `smooth_concatenate_poses`
+    if previous_segment is None:
+        yield _finish_chunk(current)
+        return
+
+    segment = Pose(current.header, current.body[start:])
+    yield _finish_chunk(_smooth_segment(previous_segment, segment, None, padding_body))
@@ -0,0 +1,183 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, NamedTuple, Optional
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests > 0 else 0.0
+
+
+# A process holds several caches (lexicon poses, lookup results, prepared poses), each bounded separately
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_sizeof(value) -> int:
+    # Poses are measured by their arrays, which dominate their memory footprint
+    if hasattr(value, "body"):
+        # Imported here, so that caches of other values (e.g. glosses) do not load numpy
+        import numpy.ma as ma
+
+        data = value.body.data
+        return ma.getdata(data).nbytes + ma.getmask(data).nbytes + value.body.confidence.nbytes
+    if hasattr(value, "nbytes"):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(default_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        sizeof: Callable[[Any], int] = default_sizeof,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cache = OrderedDict()  # key -> (value, size in bytes, expiry time or None)
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl  # seconds until an entry expires, None to keep entries until they are evicted
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.loading: dict[Any, Future] = {}
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        with self.lock:
+            return self._get(key) is not None
+
+    def get(self, key):
+        with self.lock:
+            entry = self._get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            self._set(key, value)
+
+    def get_or_load(self, key, load: Callable[[Any], Any]):
+        """Returns the cached value, or loads it once, even if multiple threads ask for the same key."""
+        with self.lock:
+            entry = self._get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+
+            pending = self.loading.get(key)
+            if pending is None:
+                self.misses += 1
+                future = self.loading[key] = Future()
+            else:
+                # Another thread is already loading this key, share its result
+                self.hits += 1
+
+        if pending is not None:
+            return pending.result()
+
+        try:
+            value = load(key)
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self._set(key, value)
+            del self.loading[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> CacheStats:
+        with self.lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=len(self.cache),
+                bytes=self.bytes,
+                expirations=self.expirations,
+            )
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.bytes = 0
+
+    def resize(self, max_bytes: Optional[int]):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def ttl_for(self, value) -> Optional[float]:
+        return self.ttl
+
+    def _get(self, key) -> Optional[tuple]:
+        # Must be called while holding the lock. Returns the entry, unless it is missing or expired.
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+
+        expires = entry[2]
+        if expires is not None and self.clock() >= expires:
+            del self.cache[key]
+            self.bytes -= entry[1]
+            self.expirations += 1
+            return None
+
+        # Move the accessed item to the end to show it's recently used
+        self.cache.move_to_end(key)
+        return entry
+
+    def _set(self, key, value):
+        # Must be called while holding the lock
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Too large to ever fit, do not flush the whole cache for it
+
+        ttl = self.ttl_for(value)
+        expires = self.clock() + ttl if ttl is not None else None
+
+        if key in self.cache:
+            self.bytes -= self.cache.pop(key)[1]
+        self.cache[key] = (value, size, expires)
+        self.bytes += size
+        self._evict()
+
+    def _evict(self):
+        # Must be called while holding the lock. Removes the least recently used items until within the bounds.
+        while (self.maxsize is not None and len(self.cache) > self.maxsize) or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        ):
+            _, (_, evicted_size, _) = self.cache.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
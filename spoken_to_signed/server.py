@@ -0,0 +1,143 @@
+import argparse
+import json
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Optional
+
+from pose_format import Pose
+
+from spoken_to_signed.bin import (
+    _gloss_to_pose,
+    _limit_cache_size,
+    _load_gloss_cache,
+    _load_pose_lookup,
+    _load_prepared_cache,
+    _pose_caches,
+    _text_to_gloss,
+)
+
+GLOSSERS = ["simple", "spacylemma", "rules", "nmt", "gpt"]
+
+
+class TranslationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple[str, int], lexicon: str, cache_directory: str = None, cache_size: Optional[int] = None
+    ):
+        super().__init__(address, TranslationRequestHandler)
+        self.lexicon = lexicon
+        self.cache_directory = cache_directory
+        # Bytes shared by the in-memory pose caches, None to keep their own bounds
+        self.cache_size = cache_size
+
+    def warm_up(self):
+        # Load the lookups and caches ahead of the first request, they stay loaded for the server's lifetime
+        _load_pose_lookup(self.lexicon, True)
+        _load_pose_lookup(self.lexicon, False)
+        _load_prepared_cache(self.cache_directory)
+        _limit_cache_size(self.lexicon, self.cache_directory, self.cache_size)
+
+    def cache_stats(self) -> dict:
+        def describe(cache) -> dict:
+            stats = cache.stats()
+            return {**stats._asdict(), "hit_rate": stats.hit_rate}
+
+        caches = _pose_caches(self.lexicon, self.cache_directory)
+        caches["glosses"] = _load_gloss_cache(self.cache_directory).memory
+        return {name: describe(cache) for name, cache in caches.items()}
+
+    def text_to_gloss_to_pose(
+        self, text: str, glosser: str, spoken_language: str, signed_language: str, disable_fingerspelling=False
+    ) -> Pose:
+        sentences = _text_to_gloss(
+            text, spoken_language, glosser, self.cache_directory, signed_language=signed_language
+        )
+        result = _gloss_to_pose(
+            sentences, self.lexicon, spoken_language, signed_language, disable_fingerspelling, self.cache_directory
+        )
+        return result.pose
+
+
+class TranslationRequestHandler(BaseHTTPRequestHandler):
+    server: TranslationServer
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_body(HTTPStatus.OK, b"ok", "text/plain")
+        elif self.path == "/stats":
+            self.send_body(HTTPStatus.OK, json.dumps(self.server.cache_stats()).encode(), "application/json")
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):
+        if self.path != "/text_to_gloss_to_pose":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            arguments = {
+                "text": request["text"],
+                "glosser": request.get("glosser", "simple"),
+                "spoken_language": request["spoken_language"],
+                "signed_language": request["signed_language"],
+                "disable_fingerspelling": bool(request.get("disable_fingerspelling", False)),
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, f"Invalid request: {e!r}")
+            return
+
+        if arguments["glosser"] not in GLOSSERS:
+            self.send_error(HTTPStatus.BAD_REQUEST, f"Unknown glosser {arguments['glosser']}")
+            return
+
+        try:
+            pose = self.server.text_to_gloss_to_pose(**arguments)
+        except Exception as e:  # noqa: BLE001 - any failure is reported to the client, the server keeps running
+            self.send_error(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            return
+
+        buffer = BytesIO()
+        pose.write(buffer)
+        self.send_body(HTTPStatus.OK, buffer.getvalue(), "application/pose")
+
+    def send_body(self, status: HTTPStatus, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lexicon", type=str, required=True)
+    parser.add_argument(
+        "--cache-directory", type=str, help="Directory to persist preprocessed lexicon poses and glosses in"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=512, help="Megabytes of memory shared by the in-memory pose caches"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = TranslationServer(
+        (args.host, args.port), args.lexicon, args.cache_directory, args.cache_size * 1024 * 1024
+    )
+    server.warm_up()
+
+    host, port = server.server_address[:2]
+    print(f"Serving POST http://{host}:{port}/text_to_gloss_to_pose")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
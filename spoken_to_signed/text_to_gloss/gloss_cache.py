@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Optional
+
+from spoken_to_signed.lru_cache import LRUCache
+
+from .types import Gloss, GlossItem
+
+
+def encode_glosses(sentences: list[Gloss]) -> str:
+    return json.dumps([[list(item) for item in sentence] for sentence in sentences], ensure_ascii=False)
+
+
+def decode_glosses(value: str) -> list[Gloss]:
+    return [[GlossItem(word=word, gloss=gloss) for word, gloss in sentence] for sentence in json.loads(value)]
+
+
+class GlossCache:
+    """
+    Memoizes glossers, which are pure functions of their text, language and options.
+    Glosses are kept in memory, and optionally in an SQLite database shared by all processes using it.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory: LRUCache = None):
+        self.path = path
+        # Entries are small, so the memory is bounded by their number rather than their size
+        self.memory = memory if memory is not None else LRUCache(maxsize=10000, max_bytes=None)
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def cache_key(self, glosser: str, version: Any, text: str, language: str, kwargs: dict) -> Optional[str]:
+        try:
+            return json.dumps([glosser, version, text, language, kwargs], sort_keys=True, ensure_ascii=False)
+        except TypeError:
+            # Options that can not be serialized can not be compared either, so their glosses are not cached
+            return None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # Write-ahead logging lets processes read while another one writes
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS glosses (key TEXT PRIMARY KEY, glosses TEXT NOT NULL)")
+            self.connection.commit()
+        return self.connection
+
+    def read(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.connect().execute("SELECT glosses FROM glosses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def write(self, key: str, value: str):
+        with self.lock:
+            connection = self.connect()
+            connection.execute("INSERT OR REPLACE INTO glosses (key, glosses) VALUES (?, ?)", (key, value))
+            connection.commit()
+
+    def load(self, key: str, gloss: Callable[[], list[Gloss]]) -> str:
+        if self.path is not None:
+            value = self.read(key)
+            if value is not None:
+                return value
+
+        value = encode_glosses(gloss())
+        if self.path is not None:
+            self.write(key, value)
+        return value
+
+    def get_or_gloss(
+        self, glosser: str, version: Any, text: str, language: str, kwargs: dict, gloss: Callable[[], list[Gloss]]
+    ) -> list[Gloss]:
+        key = self.cache_key(glosser, version, text, language, kwargs)
+        if key is None:
+            return gloss()
+
+        # Glosses are stored encoded, so every caller gets its own lists
+        return decode_glosses(self.memory.get_or_load(key, lambda k: self.load(k, gloss)))
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -1,15 +1,19 @@
+import asyncio
 import json
 import os
 import re
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from pathlib import Path
-
-from dotenv import load_dotenv
-from openai import OpenAI
+from typing import Optional
 
 from spoken_to_signed.text_to_gloss.types import Gloss, GlossItem
 
+# Part of the gloss cache key (with the model), bump when the prompt or few-shot examples change
+GLOSSER_VERSION = 1
+MODEL = "gpt-4o-mini"
+
 SYSTEM_PROMPT = """
 You are a helpful assistant, who helps glossify sentences into sign language glosses.
 Your task is to convert spoken language text into glossed sign language sentences following specific formatting rules.
@@ -39,6 +43,10 @@ Use these rules and examples to produce accurate and readable glosses for each s
 
 @lru_cache(maxsize=1)
 def get_openai_client():
+    # Imported here, so that importing this module does not pay for the OpenAI client
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
     load_dotenv()
     api_key = os.environ.get("OPENAI_API_KEY", None)
     return OpenAI(api_key=api_key)
@@ -85,32 +93,183 @@ def sentence_to_glosses(sentence: str) -> Iterator[GlossItem]:
             yield GlossItem(word=sub_item_word, gloss=sub_item_gloss)
 
 
-def text_to_gloss(text: str, language: str, signed_language: str, **kwargs) -> list[Gloss]:
-    messages = (
+def make_messages(payload: dict) -> list[dict]:
+    # The system prompt and examples come first and never change, so providers can cache this prefix
+    return (
         [{"role": "system", "content": SYSTEM_PROMPT}]
         + few_shots()
-        + [
-            {
-                "role": "user",
-                "content": json.dumps(
-                    {
-                        "spoken_language": language,
-                        "signed_language": signed_language,
-                        "text": text,
-                    }
-                ),
-            }
-        ]
+        + [{"role": "user", "content": json.dumps(payload)}]
     )
 
+
+def prediction_to_glosses(sentences: list[str]) -> list[Gloss]:
+    return [list(sentence_to_glosses(sentence)) for sentence in sentences]
+
+
+def text_to_gloss(text: str, language: str, signed_language: str, **kwargs) -> list[Gloss]:
+    messages = make_messages({"spoken_language": language, "signed_language": signed_language, "text": text})
+
     response = get_openai_client().chat.completions.create(
-        model="gpt-4o-mini", temperature=0, seed=42, messages=messages, max_tokens=500
+        model=MODEL, temperature=0, seed=42, messages=messages, max_tokens=500
     )
 
     prediction = response.choices[0].message.content
     print(prediction)
     sentences = json.loads(prediction)
-    return [list(sentence_to_glosses(sentence)) for sentence in sentences]
+    return prediction_to_glosses(sentences)
+
+
+PACKED_PROMPT = """
+Several texts may be given at once, as a list under "texts".
+Then, respond with a JSON list with one entry per text, in order, each entry being the list of glossed sentences of that text.
+""".strip()
+
+
+class RateLimiter:
+    """Spaces out the start of requests, to stay under a number of requests per minute."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self.next_start = 0.0
+
+    async def wait(self):
+        # Every caller reserves the next free slot before sleeping, so no lock is needed within an event loop
+        now = asyncio.get_running_loop().time()
+        start = max(now, self.next_start)
+        self.next_start = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+class AsyncGlosser:
+    """
+    Glosses many texts with concurrent, rate-limited requests, packing several texts in each request.
+    Create it within the event loop it is used in.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        pack_size: int = 4,
+        max_concurrency: int = 8,
+        requests_per_minute: Optional[float] = None,
+        timeout: float = 60,
+        retries: int = 3,
+    ):
+        if client is None:
+            from dotenv import load_dotenv
+            from openai import AsyncOpenAI
+
+            load_dotenv()
+            # The client retries failed and rate-limited requests with exponential backoff
+            client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY", None), timeout=timeout, max_retries=retries)
+
+        self.client = client
+        self.pack_size = pack_size
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate_limiter = RateLimiter(requests_per_minute)
+
+    async def complete(self, messages: list[dict], max_tokens: int):
+        async with self.semaphore:
+            await self.rate_limiter.wait()
+            response = await self.client.chat.completions.create(
+                model=MODEL, temperature=0, seed=42, messages=messages, max_tokens=max_tokens
+            )
+        return json.loads(response.choices[0].message.content)
+
+    async def gloss_text(self, text: str, language: str, signed_language: str) -> list[Gloss]:
+        messages = make_messages({"spoken_language": language, "signed_language": signed_language, "text": text})
+        return prediction_to_glosses(await self.complete(messages, max_tokens=500))
+
+    async def gloss_pack(
+        self, texts: list[str], language: str, signed_language: str, return_exceptions: bool = False
+    ) -> list[list[Gloss]]:
+        if len(texts) > 1:
+            messages = make_messages({"spoken_language": language, "signed_language": signed_language, "texts": texts})
+            messages[0] = {"role": "system", "content": f"{SYSTEM_PROMPT}\n\n{PACKED_PROMPT}"}
+            try:
+                predictions = await self.complete(messages, max_tokens=500 * len(texts))
+                if (
+                    isinstance(predictions, list)
+                    and len(predictions) == len(texts)
+                    and all(isinstance(sentences, list) for sentences in predictions)
+                ):
+                    return [prediction_to_glosses(sentences) for sentences in predictions]
+            except Exception:  # noqa: BLE001 - a failed pack is retried text by text, below
+                pass
+
+        # Texts that were not packed, or whose packed request failed or can not be matched to them,
+        # are glossed one by one
+        requests = [self.gloss_text(text, language, signed_language) for text in texts]
+        return list(await asyncio.gather(*requests, return_exceptions=return_exceptions))
+
+    async def texts_to_gloss(
+        self, texts: list[str], language: str, signed_language: str, return_exceptions: bool = False
+    ) -> list[list[Gloss]]:
+        """With `return_exceptions`, a text that failed is returned as its exception, like in `asyncio.gather`."""
+        packs = [texts[i : i + self.pack_size] for i in range(0, len(texts), self.pack_size)]
+        results = await asyncio.gather(
+            *[self.gloss_pack(pack, language, signed_language, return_exceptions) for pack in packs]
+        )
+        return [glosses for pack_glosses in results for glosses in pack_glosses]
+
+
+async def texts_to_gloss_async(
+    texts: Iterable[str],
+    language: str,
+    signed_language: str,
+    pack_size: int = 4,
+    max_concurrency: int = 8,
+    requests_per_minute: Optional[float] = None,
+    return_exceptions: bool = False,
+    **unused_kwargs,
+) -> list[list[Gloss]]:
+    # Runs in the current event loop, e.g. of an async server
+    glosser = AsyncGlosser(
+        pack_size=pack_size, max_concurrency=max_concurrency, requests_per_minute=requests_per_minute
+    )
+    try:
+        return await glosser.texts_to_gloss(list(texts), language, signed_language, return_exceptions)
+    finally:
+        await glosser.client.close()
+
+
+def texts_to_gloss(
+    texts: Iterable[str],
+    language: str,
+    signed_language: str,
+    pack_size: int = 4,
+    max_concurrency: int = 8,
+    requests_per_minute: Optional[float] = None,
+    **unused_kwargs,
+) -> Iterator[list[Gloss]]:
+    def run():
+        return asyncio.run(
+            texts_to_gloss_async(
+                texts,
+                language,
+                signed_language,
+                pack_size=pack_size,
+                max_concurrency=max_concurrency,
+                requests_per_minute=requests_per_minute,
+                return_exceptions=True,
+            )
+        )
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        results = run()
+    else:
+        # A running event loop can not run another one, so the requests get their own loop, in another thread.
+        # Async callers should await `texts_to_gloss_async` instead, which does not block their loop.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = executor.submit(run).result()
+
+    # A text that failed only raises once it is reached, after the texts before it
+    for glosses in results:
+        if isinstance(glosses, BaseException):
+            raise glosses
+        yield glosses
 
 
 if __name__ == "__main__":
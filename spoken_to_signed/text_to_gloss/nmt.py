@@ -1,18 +1,27 @@
+import functools
+import itertools
 import os
 import tarfile
-from typing import Any
-
-import requests
-import sentencepiece as spm
-import torch as pt
-from sockeye import inference, model
+import threading
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, Any, Optional
 
 from .types import Gloss, GlossItem
 
+# torch, sockeye and the models are only loaded on the first translation, to keep importing this module fast
+if TYPE_CHECKING:
+    import sentencepiece as spm
+    from sockeye import inference
+
+# Part of the gloss cache key, bump when the model or its decoding changes
+GLOSSER_VERSION = 1
+
 MODELS_PATH = "./models"
 
 
 def download_and_extract_file(url: str, filepath: str):
+    import requests
+
     print(f"Attempting to download and extract: {url}")
 
     r = requests.get(url)
@@ -40,7 +49,12 @@ def download_model_if_does_not_exist(sockeye_paths: dict[str, str]):
     )
 
 
+@functools.cache
 def load_sockeye_models():
+    import sentencepiece as spm
+    import torch as pt
+    from sockeye import model
+
     os.makedirs(MODELS_PATH, exist_ok=True)
 
     spm_name = "sentencepiece.model"
@@ -79,10 +93,7 @@ def load_sockeye_models():
     return device, sockeye_paths_dict, sockeye_models_dict
 
 
-device, sockeye_paths_dict, sockeye_models_dict = load_sockeye_models()
-
-
-def apply_pieces(text: str, spm_model: spm.SentencePieceProcessor) -> str:
+def apply_pieces(text: str, spm_model: "spm.SentencePieceProcessor") -> str:
     text = text.strip()
 
     pieces = spm_model.encode(text, out_type=str)
@@ -114,67 +125,131 @@ def add_tag_to_text(text: str, tag: str) -> str:
     return " ".join(tokens)
 
 
-def translate(
-    text: str, source_language_code: str = "de", target_language_code: str = "dgs", nbest_size: int = 3
-) -> dict[str, Any]:
+def get_model_name(source_language_code: str) -> str:
     if source_language_code == "de":
-        model_name = "dgs_de"
-    else:
-        raise NotImplementedError()
+        return "dgs_de"
+    raise NotImplementedError()
 
-    sockeye_models = sockeye_models_dict[model_name]["sockeye_models"]
-    sockeye_source_vocabs = sockeye_models_dict[model_name]["sockeye_source_vocabs"]
-    sockeye_target_vocabs = sockeye_models_dict[model_name]["sockeye_target_vocabs"]
 
-    spm_model = sockeye_models_dict[model_name]["spm_model"]
+TRANSLATORS: dict[tuple[str, int, int, int], "inference.Translator"] = {}
+TRANSLATORS_LOCK = threading.Lock()
 
-    pieces = apply_pieces(text, spm_model)
 
-    tag_str = f"<2{target_language_code}>"
-    tagged_pieces = add_tag_to_text(pieces, tag_str)
+def load_translator(model_name: str, beam_size: int, nbest_size: int, batch_size: int = 16) -> "inference.Translator":
+    # Building a translator is not free, so one is kept for every configuration.
+    # Shorter batches are translated as they are, see `translate_batch`.
+    key = (model_name, beam_size, nbest_size, batch_size)
+    with TRANSLATORS_LOCK:
+        if key not in TRANSLATORS:
+            TRANSLATORS[key] = build_translator(*key)
+        return TRANSLATORS[key]
 
-    beam_size = nbest_size
 
-    translator = inference.Translator(
+def build_translator(model_name: str, beam_size: int, nbest_size: int, batch_size: int) -> "inference.Translator":
+    from sockeye import inference
+
+    device, sockeye_paths_dict, sockeye_models_dict = load_sockeye_models()
+
+    return inference.Translator(
         device=device,
         ensemble_mode="linear",
         scorer=inference.CandidateScorer(),
         output_scores=True,
-        batch_size=1,
+        batch_size=batch_size,
         beam_size=beam_size,
         beam_search_stop="all",
         nbest_size=nbest_size,
-        models=sockeye_models,
-        source_vocabs=sockeye_source_vocabs,
-        target_vocabs=sockeye_target_vocabs,
+        models=sockeye_models_dict[model_name]["sockeye_models"],
+        source_vocabs=sockeye_models_dict[model_name]["sockeye_source_vocabs"],
+        target_vocabs=sockeye_models_dict[model_name]["sockeye_target_vocabs"],
     )
 
-    input_ = inference.make_input_from_plain_string(0, tagged_pieces)
-    output = translator.translate([input_])[0]  # type: sockeye.inference.TranslatorOutput
 
-    translations = output.nbest_translations  # type: List[str]
-    translations = [remove_pieces(t) for t in translations]
+def translate_batch(
+    texts: list[str],
+    source_language_code: str = "de",
+    target_language_code: str = "dgs",
+    nbest_size: int = 3,
+    batch_size: int = 16,
+    threads: Optional[int] = None,
+) -> list[dict[str, Any]]:
+    model_name = get_model_name(source_language_code)
 
-    return {
-        "source_language_code": source_language_code,
-        "target_language_code": target_language_code,
-        "nbest_size": nbest_size,
-        "text": text,
-        "translations": translations,
-    }
+    from sockeye import inference
 
+    device, sockeye_paths_dict, sockeye_models_dict = load_sockeye_models()
+    spm_model = sockeye_models_dict[model_name]["spm_model"]
 
-def text_to_gloss(text: str, language: str, nbest_size: int = 3, **kwargs) -> list[Gloss]:
-    if language == "de":
-        translations_dict = translate(
-            text=text, source_language_code="de", target_language_code="dgs", nbest_size=nbest_size
-        )
-    else:
-        raise NotImplementedError()
+    if threads is not None:
+        import torch as pt
 
+        # The number of torch threads is process-wide, so it is set for every call that asks for one
+        pt.set_num_threads(threads)
+
+    tag_str = f"<2{target_language_code}>"
+    inputs = [
+        inference.make_input_from_plain_string(i, add_tag_to_text(apply_pieces(text, spm_model), tag_str))
+        for i, text in enumerate(texts)
+    ]
+
+    beam_size = nbest_size
+    translator = load_translator(model_name, beam_size, nbest_size, batch_size)
+    # By default, sockeye fills up short batches with copies of their last input, which are translated as well
+    outputs = translator.translate(inputs, fill_up_batches=False)  # type: List[sockeye.inference.TranslatorOutput]
+
+    return [
+        {
+            "source_language_code": source_language_code,
+            "target_language_code": target_language_code,
+            "nbest_size": nbest_size,
+            "text": text,
+            "translations": [remove_pieces(t) for t in output.nbest_translations],
+        }
+        for text, output in zip(texts, outputs)
+    ]
+
+
+def translate(
+    text: str, source_language_code: str = "de", target_language_code: str = "dgs", nbest_size: int = 3
+) -> dict[str, Any]:
+    [translation] = translate_batch([text], source_language_code, target_language_code, nbest_size)
+    return translation
+
+
+def translation_to_glosses(translations_dict: dict[str, Any]) -> list[Gloss]:
     best_translation = translations_dict["translations"][0]  # type: str
     glosses = best_translation.split(" ")
 
     tokens = [None] * len(glosses)
 
     return [[GlossItem(word=t, gloss=g) for t, g in zip(tokens, glosses)]]
+
+
+def text_to_gloss(text: str, language: str, nbest_size: int = 3, **kwargs) -> list[Gloss]:
+    if language != "de":
+        raise NotImplementedError()
+
+    translations_dict = translate(
+        text=text, source_language_code="de", target_language_code="dgs", nbest_size=nbest_size
+    )
+    return translation_to_glosses(translations_dict)
+
+
+def texts_to_gloss(
+    texts: Iterable[str],
+    language: str,
+    nbest_size: int = 3,
+    batch_size: int = None,
+    n_process: int = None,
+    **unused_kwargs,
+) -> Iterator[list[Gloss]]:
+    # Translates texts in batches on CPU, with `n_process` torch threads
+    if language != "de":
+        raise NotImplementedError()
+
+    batch_size = batch_size if batch_size is not None else 16
+    texts = iter(texts)
+    while batch := list(itertools.islice(texts, batch_size)):
+        translations = translate_batch(batch, "de", "dgs", nbest_size, batch_size=batch_size, threads=n_process)
+        for translations_dict in translations:
+            yield translation_to_glosses(translations_dict)
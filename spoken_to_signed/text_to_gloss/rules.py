@@ -2,11 +2,14 @@
 # adapted by Mathias Müller
 import re
 import sys
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
 
 from .common import load_spacy_model
 from .types import Gloss, GlossItem
 
+# Part of the gloss cache key, bump with every change to the rules below
+GLOSSER_VERSION = 1
+
 LANGUAGE_MODELS_RULES = {
     "de": ("de_core_news_lg", "de_core_news_md", "de_core_news_sm"),
     "fr": ("fr_core_news_lg", "fr_core_news_md", "fr_core_news_sm"),
@@ -408,15 +411,11 @@ def expand_contractions_de(text: str) -> str:
     return re.sub(r"\b([a-z]\w*)'s\b", r"\1 es", text)
 
 
-def text_to_gloss_given_spacy_model(text: str, spacy_model, lang: str = "de", punctuation=False) -> dict:
-    if text.strip() == "":
-        return {"glosses": [], "tokens": [], "gloss_string": ""}
+def empty_gloss_output() -> dict:
+    return {"glosses": [], "tokens": [], "gloss_string": ""}
 
-    if lang == "de":
-        text = expand_contractions_de(text)
-
-    doc = spacy_model(text)
 
+def doc_to_gloss(doc, lang: str = "de", punctuation=False) -> dict:
     if lang != "fr":
         # Rule 0: Attach separable verb particle to the verb lemma, but not for French
         attach_svp(doc)
@@ -449,6 +448,39 @@ def text_to_gloss_given_spacy_model(text: str, spacy_model, lang: str = "de", pu
     }
 
 
+def preprocess_text(text: str, lang: str = "de") -> str:
+    if lang == "de":
+        text = expand_contractions_de(text)
+    return text
+
+
+def text_to_gloss_given_spacy_model(text: str, spacy_model, lang: str = "de", punctuation=False) -> dict:
+    if text.strip() == "":
+        return empty_gloss_output()
+
+    doc = spacy_model(preprocess_text(text, lang))
+    return doc_to_gloss(doc, lang, punctuation=punctuation)
+
+
+def texts_to_gloss_given_spacy_model(
+    texts: Iterable[str], spacy_model, lang: str = "de", punctuation=False, batch_size: int = None, n_process: int = 1
+) -> Iterator[dict]:
+    # Texts are parsed in batches with `nlp.pipe`, and the original text is passed along to detect empty ones
+    pairs = ((preprocess_text(text, lang), text) for text in texts)
+    for doc, text in spacy_model.pipe(pairs, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        if text.strip() == "":
+            yield empty_gloss_output()
+        else:
+            yield doc_to_gloss(doc, lang, punctuation=punctuation)
+
+
+def output_to_glosses(output_dict: dict) -> list[Gloss]:
+    glosses = output_dict["glosses"]
+    tokens = output_dict["tokens"]
+
+    return [[GlossItem(word=t, gloss=g) for t, g in zip(tokens, glosses)]]
+
+
 def text_to_gloss(text: str, language: str, punctuation=False, **unused_kwargs) -> list[Gloss]:
     if language not in LANGUAGE_MODELS_RULES:
         raise NotImplementedError(f"Don't know language '{language}'.")
@@ -458,7 +490,25 @@ def text_to_gloss(text: str, language: str, punctuation=False, **unused_kwargs)
     spacy_model = load_spacy_model(model_names)
     output_dict = text_to_gloss_given_spacy_model(text, spacy_model=spacy_model, lang=language, punctuation=punctuation)
 
-    glosses = output_dict["glosses"]
-    tokens = output_dict["tokens"]
+    return output_to_glosses(output_dict)
 
-    return [[GlossItem(word=t, gloss=g) for t, g in zip(tokens, glosses)]]
+
+def texts_to_gloss(
+    texts: Iterable[str], language: str, punctuation=False, batch_size: int = None, n_process: int = 1, **unused_kwargs
+) -> Iterator[list[Gloss]]:
+    if language not in LANGUAGE_MODELS_RULES:
+        raise NotImplementedError(f"Don't know language '{language}'.")
+
+    model_names = LANGUAGE_MODELS_RULES[language]
+
+    spacy_model = load_spacy_model(model_names)
+    outputs = texts_to_gloss_given_spacy_model(
+        texts,
+        spacy_model=spacy_model,
+        lang=language,
+        punctuation=punctuation,
+        batch_size=batch_size,
+        n_process=n_process,
+    )
+    for output_dict in outputs:
+        yield output_to_glosses(output_dict)
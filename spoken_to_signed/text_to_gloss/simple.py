@@ -4,6 +4,9 @@ from simplemma.strategies.dictionaries.dictionary_factory import SUPPORTED_LANGU
 
 from .types import Gloss, GlossItem
 
+# Part of the gloss cache key, bump when tokenization or lemmatization changes
+GLOSSER_VERSION = 1
+
 
 def text_to_gloss(text: str, language: str, **unused_kwargs) -> list[Gloss]:
     if language in SUPPORTED_LANGUAGES:
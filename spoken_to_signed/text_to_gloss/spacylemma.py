@@ -1,6 +1,11 @@
+from collections.abc import Iterable, Iterator
+
 from .common import load_spacy_model
 from .types import Gloss, GlossItem
 
+# Part of the gloss cache key, bump when lemmas are chosen differently
+GLOSSER_VERSION = 1
+
 LANGUAGE_MODELS_SPACY = {
     "de": "de_core_news_lg",
     "fr": "fr_core_news_lg",
@@ -9,7 +14,7 @@ LANGUAGE_MODELS_SPACY = {
 }
 
 
-def text_to_gloss(text: str, language: str, ignore_punctuation: bool = False, **unused_kwargs) -> list[Gloss]:
+def load_lemmatizer(language: str):
     if language not in LANGUAGE_MODELS_SPACY:
         raise NotImplementedError(f"Don't know language '{language}'.")
 
@@ -17,10 +22,10 @@ def text_to_gloss(text: str, language: str, ignore_punctuation: bool = False, **
 
     # disable unnecessary components to make lemmatization faster
 
-    spacy_model = load_spacy_model(model_name, disable=("parser", "ner"))
+    return load_spacy_model(model_name, disable=("parser", "ner"))
 
-    doc = spacy_model(text)
 
+def doc_to_gloss(doc, ignore_punctuation: bool = False) -> list[Gloss]:
     glosses = []  # type: Gloss
 
     for token in doc:
@@ -31,3 +36,25 @@ def text_to_gloss(text: str, language: str, ignore_punctuation: bool = False, **
         glosses.append(GlossItem(word=token.text, gloss=token.lemma_))
 
     return [glosses]
+
+
+def text_to_gloss(text: str, language: str, ignore_punctuation: bool = False, **unused_kwargs) -> list[Gloss]:
+    spacy_model = load_lemmatizer(language)
+
+    doc = spacy_model(text)
+
+    return doc_to_gloss(doc, ignore_punctuation=ignore_punctuation)
+
+
+def texts_to_gloss(
+    texts: Iterable[str],
+    language: str,
+    ignore_punctuation: bool = False,
+    batch_size: int = None,
+    n_process: int = 1,
+    **unused_kwargs,
+) -> Iterator[list[Gloss]]:
+    spacy_model = load_lemmatizer(language)
+
+    for doc in spacy_model.pipe(texts, batch_size=batch_size, n_process=n_process):
+        yield doc_to_gloss(doc, ignore_punctuation=ignore_punctuation)
@@ -0,0 +1,72 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from spoken_to_signed.gloss_to_pose import CSVPoseLookup
+from spoken_to_signed.gloss_to_pose.lookup.async_lookup import AsyncPoseLookup, AsyncPoseReader
+
+fsspec = pytest.importorskip("fsspec")
+from fsspec.implementations.memory import MemoryFileSystem  # noqa: E402
+
+SENTENCE = [("kleine", "kleine"), ("kinder", "kinder"), ("Kinder", "KIND"), ("zürich", "zürich")]
+
+
+class FlakyFileSystem(MemoryFileSystem):
+    """A memory filesystem that fails the first read of every file, and counts all reads."""
+
+    protocol = "flaky"
+    reads = []
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        return super()._strip_protocol(path.replace("flaky://", "memory://", 1))
+
+    def cat_file(self, path, *args, **kwargs):
+        self.reads.append(path)
+        if self.reads.count(path) == 1:
+            raise ConnectionError("Transient failure")
+        return super().cat_file(path, *args, **kwargs)
+
+
+@pytest.fixture
+def flaky_file_system():
+    fsspec.register_implementation("flaky", FlakyFileSystem, clobber=True)
+    FlakyFileSystem.reads = []
+    file_system = FlakyFileSystem()
+    with open("assets/dummy_lexicon/sgg/pizza.pose", "rb") as f:
+        file_system.pipe_file("/lexicon/pizza.pose", f.read())
+    yield file_system
+    file_system.rm("/lexicon", recursive=True)
+
+
+def test_async_lookup_matches_lookup():
+    lookup = CSVPoseLookup("assets/dummy_lexicon")
+    expected = CSVPoseLookup("assets/dummy_lexicon").lookup_sequence(SENTENCE, "de", "sgg")
+
+    results = asyncio.run(AsyncPoseLookup(lookup).lookup_sequence(SENTENCE, "de", "sgg"))
+
+    assert [r.key for r in results] == [r.key for r in expected]
+    for result, expected_result in zip(results, expected):
+        np.testing.assert_array_equal(result.pose.body.data, expected_result.pose.body.data)
+    # The files were read asynchronously, the synchronous loads were all served from the cache
+    assert lookup.cache.stats().misses == 0
+    assert len(lookup.cache) == 2
+
+
+def test_reads_are_coalesced_and_retried(flaky_file_system):
+    reader = AsyncPoseReader(backoff=0)
+
+    async def read_concurrently():
+        return await asyncio.gather(*[reader.read_pose("flaky:///lexicon/pizza.pose") for _ in range(4)])
+
+    poses = asyncio.run(read_concurrently())
+
+    assert all(pose is poses[0] for pose in poses)
+    assert len(FlakyFileSystem.reads) == 2  # one failure, one retry
+
+
+def test_missing_files_are_not_retried(flaky_file_system):
+    reader = AsyncPoseReader(backoff=0)
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(reader.read_pose("memory:///lexicon/missing.pose"))
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+from pose_format import Pose
+
+from spoken_to_signed.batch import BatchOptions, read_items, translate_batch
+from spoken_to_signed.bin import _pose_caches
+from spoken_to_signed.lru_cache import DEFAULT_MAX_BYTES
+
+
+def test_read_items_formats():
+    jsonl = io.StringIO('{"id": "a", "text": "Pizza"}\n\n{"text": "Kinder"}\n')
+    assert [(i.id, i.text) for i in read_items(jsonl, "jsonl")] == [("a", "Pizza"), ("00000001", "Kinder")]
+
+    tsv = io.StringIO("a\tKleine Kinder\nessen\n")
+    assert [(i.id, i.text) for i in read_items(tsv, "tsv")] == [("a", "Kleine Kinder"), ("00000001", "essen")]
+
+
+@pytest.mark.parametrize("item_id", ["../escape", "nested/id", "/absolute", ".hidden", ".."])
+def test_read_items_rejects_ids_outside_of_output_directory(item_id):
+    with pytest.raises(ValueError, match="Invalid id"):
+        list(read_items(io.StringIO(f"{item_id}\tPizza\n"), "tsv"))
+
+
+def test_read_items_rejects_duplicate_ids():
+    with pytest.raises(ValueError, match="Duplicate id"):
+        list(read_items(io.StringIO("a\tPizza\na\tKinder\n"), "tsv"))
+    # Generated ids may collide with given ones too
+    with pytest.raises(ValueError, match="Duplicate id"):
+        list(read_items(io.StringIO("Pizza\n00000000\tKinder\n"), "tsv"))
+
+
+def test_translate_batch(tmp_path):
+    options = BatchOptions(
+        glosser="simple",
+        lexicon="assets/dummy_lexicon",
+        spoken_language="de",
+        signed_language="sgg",
+        output_directory=str(tmp_path),
+        shard_size=2,
+        disable_fingerspelling=True,
+    )
+    items = read_items(io.StringIO("Kleine Kinder essen Pizza.\nabcd\nPizza essen\n"), "txt")
+
+    results = list(translate_batch(items, options, workers=1))
+    assert [r.error is None for r in results] == [True, False, True]
+    assert set(results[0].timings) == {"gloss", "pose", "write"}
+
+    with open(tmp_path / "shard-00001" / "00000002.pose", "rb") as f:
+        assert Pose.read(f.read()).body.data.shape[0] > 0
+
+
+def test_workers_share_the_cache_size(tmp_path):
+    options = BatchOptions(
+        glosser="simple",
+        lexicon="assets/dummy_lexicon",
+        spoken_language="de",
+        signed_language="sgg",
+        output_directory=str(tmp_path),
+        cache_size=60 * 1024 * 1024,
+    )
+    caches = _pose_caches(options.lexicon).values()
+    try:
+        list(translate_batch(read_items(io.StringIO("Pizza\n"), "txt"), options, workers=1))
+        assert [cache.max_bytes for cache in caches] == [10 * 1024 * 1024] * 6
+    finally:
+        # The caches are loaded once per process, and shared with other tests
+        for cache in caches:
+            cache.resize(DEFAULT_MAX_BYTES)
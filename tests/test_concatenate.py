@@ -0,0 +1,130 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+from pose_format import Pose
+
+from spoken_to_signed.gloss_to_pose import assemble_poses, concatenate, concatenate_poses
+from spoken_to_signed.gloss_to_pose.concatenate import ConcatenationSettings, prepare_pose, trim_frames
+from spoken_to_signed.gloss_to_pose.lookup.fingerspelling_lookup import FingerspellingPoseLookup
+from spoken_to_signed.gloss_to_pose.smoothing import find_best_connection_points, smooth_concatenate_poses
+from spoken_to_signed.gloss_to_pose.streaming import stream_prepared_poses
+
+
+def _load_poses() -> list[Pose]:
+    poses = []
+    for name in ["kleine", "kinder", "essen", "pizza"]:
+        with open(f"assets/dummy_lexicon/sgg/{name}.pose", "rb") as f:
+            poses.append(Pose.read(f.read()))
+    return poses
+
+
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_parallel_concatenation_matches_serial(executor_class):
+    poses = _load_poses()
+    expected = concatenate_poses(copy.deepcopy(poses))
+
+    with executor_class(max_workers=2) as executor:
+        actual = concatenate_poses(copy.deepcopy(poses), executor=executor)
+
+    np.testing.assert_array_equal(ma.getdata(actual.body.data), ma.getdata(expected.body.data))
+    np.testing.assert_array_equal(actual.body.confidence, expected.body.confidence)
+
+
+def test_parallel_fingerspelling_matches_serial():
+    expected = FingerspellingPoseLookup().lookup("hallo", "hallo", "de", "sgg").pose
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        actual = FingerspellingPoseLookup(executor=executor).lookup("hallo", "hallo", "de", "sgg").pose
+
+    np.testing.assert_array_equal(ma.getdata(actual.body.data), ma.getdata(expected.body.data))
+
+
+def test_assemble_poses_keeps_sentences():
+    poses = _load_poses()
+    sentences = [concatenate_poses(poses[:2]), concatenate_poses(poses[2:])]
+    original = [ma.getdata(sentence.body.data).copy() for sentence in sentences]
+
+    document = assemble_poses(sentences)
+
+    # The start of the first sentence is before the junction, and is copied through as is
+    data = ma.getdata(document.body.data)
+    np.testing.assert_array_equal(data[:10], original[0][:10])
+    assert document.body.fps == sentences[0].body.fps
+    assert len(data) < sum(len(o) for o in original) + int(0.2 * document.body.fps)
+
+
+def test_junction_smoothing():
+    poses = _load_poses()
+    expected = concatenate_poses(copy.deepcopy(poses))
+    actual = concatenate_poses(copy.deepcopy(poses), smoothing="junctions")
+    assert actual.body.data.shape == expected.body.data.shape
+    assert np.isfinite(ma.getdata(actual.body.data)).all()
+
+    with pytest.raises(ValueError, match="Unknown smoothing"):
+        concatenate_poses(copy.deepcopy(poses), smoothing="splines")
+
+
+def test_connection_settings_are_used(monkeypatch):
+    monkeypatch.setattr(ConcatenationSettings, "connection_features", "pca")
+    monkeypatch.setattr(ConcatenationSettings, "connection_dtype", np.float32)
+    monkeypatch.setattr(ConcatenationSettings, "pca_components", 4)
+    searches = []
+
+    def recording_search(poses, **kwargs):
+        searches.append(kwargs)
+        return find_best_connection_points(poses, **kwargs)
+
+    monkeypatch.setattr(concatenate, "find_best_connection_points", recording_search)
+
+    poses = _load_poses()
+    sentences = [concatenate_poses(copy.deepcopy(poses[:2])), concatenate_poses(copy.deepcopy(poses[2:]))]
+    assemble_poses(sentences)
+    list(stream_prepared_poses([prepare_pose(pose) for pose in poses[:2]]))
+
+    assert len(searches) == 4
+    assert all(search == {"features": "pca", "dtype": np.float32, "pca_components": 4} for search in searches)
+
+
+def test_junction_smoothing_only_changes_junctions():
+    prepared = [prepare_pose(pose) for pose in _load_poses()]
+    signs = []
+    for i, (pose, boundary) in enumerate(prepared):
+        first_frame, last_frame = trim_frames(pose, boundary, i > 0, i < len(prepared) - 1)
+        signs.append(Pose(pose.header, pose.body[first_frame:last_frame]))
+    junctions = find_best_connection_points(signs)
+    starts = [0] + [next_start for _, next_start in junctions]
+    ends = [end for end, _ in junctions] + [len(signs[-1].body.data)]
+    segments = [
+        (sign.body.data[start:end], sign.body.confidence[start:end]) for sign, start, end in zip(signs, starts, ends)
+    ]
+
+    joined = smooth_concatenate_poses(signs, junctions=junctions, smoothing="junctions")
+    data = ma.getdata(joined.body.data)
+    gap = int(0.2 * joined.body.fps)
+    half_window = 1  # of the default savgol window of 3 frames
+    assert gap > 2 * half_window
+
+    frame = 0
+    for i, (segment_data, segment_confidence) in enumerate(segments):
+        length = len(segment_data)
+        # Known frames further than half the filter window from a junction are the trimmed input frames
+        first, last = half_window if i > 0 else 0, length - half_window if i < len(segments) - 1 else length
+        known = segment_confidence[first:last] > 0
+        output = data[frame + first : frame + last]
+        np.testing.assert_array_equal(output[known], ma.getdata(segment_data)[first:last][known])
+
+        if i < len(segments) - 1:
+            # Points known at both ends of the junction are linearly interpolated between them
+            next_data, next_confidence = segments[i + 1]
+            both_known = (segment_confidence[-1] > 0) & (next_confidence[0] > 0)
+            before, after = ma.getdata(segment_data)[-1], ma.getdata(next_data)[0]
+            for step in range(1 + half_window, gap + 1 - half_window):
+                interpolated = before + (after - before) * step / (gap + 1)
+                gap_frame = data[frame + length + step - 1]
+                np.testing.assert_allclose(gap_frame[both_known], interpolated[both_known], rtol=1e-5, atol=1e-4)
+
+        frame += length + gap
+    assert frame - gap == len(data)
@@ -0,0 +1,130 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+
+from spoken_to_signed.gloss_to_pose import CompiledPoseLookup, CSVPoseLookup
+from spoken_to_signed.gloss_to_pose.lookup.compiled_lookup import compile_index
+from spoken_to_signed.gloss_to_pose.lookup.disk_cache import ORPHAN_AGE, PoseDiskCache
+
+URL = "gs://lexicon/sgg/pizza.pose"
+
+
+@pytest.fixture
+def lookup() -> CSVPoseLookup:
+    return CSVPoseLookup("assets/dummy_lexicon")
+
+
+def _read(lookup: CSVPoseLookup, name: str):
+    return lookup.read_pose(f"sgg/{name}.pose")
+
+
+def test_pose_round_trip(lookup, tmp_path):
+    pose = _read(lookup, "pizza")
+    cache = PoseDiskCache(str(tmp_path))
+    assert URL not in cache
+
+    cache.set(URL, pose)
+    loaded = cache.get(URL)
+
+    assert URL in cache
+    assert loaded.body.fps == pose.body.fps
+    np.testing.assert_array_equal(ma.getdata(loaded.body.data), ma.getdata(pose.body.data))
+    np.testing.assert_array_equal(ma.getmaskarray(loaded.body.data), ma.getmaskarray(pose.body.data))
+    np.testing.assert_array_equal(loaded.body.confidence, pose.body.confidence)
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_remote_poses_are_fetched_once_per_directory(lookup, tmp_path):
+    pose = _read(lookup, "pizza")
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return pose
+
+    # Two lookups, e.g. in two processes, sharing the same cache directory
+    for _ in range(2):
+        remote_lookup = CSVPoseLookup("assets/dummy_lexicon", disk_cache=PoseDiskCache(str(tmp_path)))
+        remote_lookup.read_gcs_pose = fetch
+        remote_lookup.read_pose(URL)
+
+    assert fetched == [URL]
+
+
+def test_entries_are_kept_until_cleared(lookup, tmp_path):
+    cache = PoseDiskCache(str(tmp_path))
+    cache.set(URL, _read(lookup, "pizza"))
+
+    # Entries are keyed by URL, so a replaced remote file is only fetched again once the cache is cleared
+    replaced = _read(lookup, "kinder")
+    assert len(cache.get_or_fetch(URL, lambda url: replaced).body.data) != len(replaced.body.data)
+
+    cache.clear()
+    assert URL not in cache
+    assert len(cache.get_or_fetch(URL, lambda url: replaced).body.data) == len(replaced.body.data)
+
+
+def test_least_recently_used_entries_are_evicted(lookup, tmp_path):
+    poses = {name: _read(lookup, name) for name in ["kleine", "kinder", "pizza"]}
+    cache = PoseDiskCache(str(tmp_path), max_bytes=None)
+    for i, (name, pose) in enumerate(poses.items()):
+        cache.set(name, pose)
+        os.utime(cache.path(name), (i, i))
+
+    # Reading an entry marks it as recently used
+    cache.get("kleine")
+
+    sizes = {name: os.path.getsize(cache.path(name)) for name in poses}
+    cache.max_bytes = sizes["kleine"] + sizes["pizza"]
+    cache.evict()
+
+    assert [name in cache for name in poses] == [True, False, True]
+
+
+def test_evicts_only_after_sweep_bytes_were_written(lookup, tmp_path):
+    pose = _read(lookup, "pizza")
+    cache = PoseDiskCache(str(tmp_path), max_bytes=1, sweep_bytes=1024 * 1024 * 1024)
+    for name in "abc":
+        cache.set(name, pose)
+    assert all(name in cache for name in "abc")
+
+    # Once enough was written, the next write sweeps the directory
+    cache.sweep_bytes = 1
+    cache.set("d", pose)
+    assert not any(name in cache for name in "abcd")
+    assert cache.unswept_bytes == 0
+
+
+def test_orphaned_temporary_files_are_removed(tmp_path):
+    orphan = tmp_path / "ab" / "orphan.tmp"
+    writing = tmp_path / "ab" / "writing.tmp"
+    orphan.parent.mkdir()
+    orphan.write_bytes(b"partial")
+    writing.write_bytes(b"partial")
+    old = time.time() - ORPHAN_AGE - 1
+    os.utime(orphan, (old, old))
+
+    PoseDiskCache(str(tmp_path)).evict()
+
+    # Recent temporary files may belong to another process, still writing them
+    assert not orphan.exists()
+    assert writing.exists()
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_local_poses_are_read_directly(tmp_path, compiled):
+    directory = tmp_path / "lexicon"
+    shutil.copytree("assets/dummy_lexicon", directory)
+    if compiled:
+        compile_index(str(directory))
+    lookup_class = CompiledPoseLookup if compiled else CSVPoseLookup
+    cache_directory = tmp_path / "cache"
+    lookup = lookup_class(str(directory), disk_cache=PoseDiskCache(str(cache_directory)))
+
+    # The disk cache is only used once a remote pose is read
+    lookup.lookup("pizza", "pizza", "de", "sgg")
+    assert not cache_directory.exists()
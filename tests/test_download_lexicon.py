@@ -0,0 +1,44 @@
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+from spoken_to_signed.download_lexicon import add_data, indexed_paths, normalize_rows, ordered_writes
+
+
+def _row(path: str, words: str, glosses: str = "") -> dict[str, str]:
+    return {
+        "path": path,
+        "spoken_language": "de",
+        "signed_language": "sgg",
+        "start": "0",
+        "end": "1.0",
+        "words": words,
+        "glosses": glosses,
+        "priority": "",
+    }
+
+
+def test_normalize_rows_glosses_words():
+    rows = [_row("a.pose", "Kinder"), _row("b.pose", "Kinder"), _row("c.pose", "Pizza", "PIZZA")]
+    normalize_rows(rows)
+    assert [row["glosses"] for row in rows] == ["kind", "kind", "PIZZA"]
+
+
+def test_ordered_writes_keep_order():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        rows = ((executor.submit(lambda: None), _row(f"{i}.pose", "")) for i in range(20))
+        paths = [row["path"] for row in ordered_writes(rows, max_pending=3)]
+    assert paths == [f"{i}.pose" for i in range(20)]
+
+
+def test_interrupted_download_resumes(tmp_path):
+    add_data([_row("sgg/a.pose", "a", "A"), _row("sgg/b.pose", "b", "B")], str(tmp_path))
+
+    # An interruption while writing the last row leaves it partially written
+    with open(tmp_path / "index.csv", "a", encoding="utf-8") as f:
+        f.write("sgg/c.pose,de,s")
+
+    assert indexed_paths(str(tmp_path)) == {"sgg/a.pose", "sgg/b.pose"}
+
+    add_data([_row("sgg/c.pose", "c", "C")], str(tmp_path))
+    with open(tmp_path / "index.csv", encoding="utf-8") as f:
+        assert [row["path"] for row in csv.DictReader(f)] == ["sgg/a.pose", "sgg/b.pose", "sgg/c.pose"]
@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+
+from spoken_to_signed.gloss_to_pose import concatenate_poses
+from spoken_to_signed.gloss_to_pose.lookup import fingerspelling_lookup
+from spoken_to_signed.gloss_to_pose.lookup.fingerspelling_lookup import FingerspellingPoseLookup
+from spoken_to_signed.gloss_to_pose.smoothing import find_best_connection_point, find_best_connection_points
+
+
+@pytest.fixture(scope="module")
+def lookup() -> FingerspellingPoseLookup:
+    return FingerspellingPoseLookup()
+
+
+def _reference_lookup(lookup: FingerspellingPoseLookup, word: str, spoken_language: str, signed_language: str):
+    """Concatenates the original letter poses, without the prepared alphabet."""
+    alphabet = lookup.get_alphabet(spoken_language, signed_language)
+    poses = [lookup.get_pose(alphabet.rows[letter][0]) for letter in lookup.split_letters(word, alphabet)]
+    poses[-1] = lookup.stretch_pose(poses[-1], 2)
+    return concatenate_poses(poses)
+
+
+@pytest.mark.parametrize(("word", "spoken_language", "signed_language"), [("hallo", "de", "sgg"), ("ab", "en", "ase")])
+def test_fingerspelling_matches_original_letters(lookup, word, spoken_language, signed_language):
+    expected = _reference_lookup(lookup, word, spoken_language, signed_language)
+    actual = lookup.lookup(word, word, spoken_language, signed_language).pose
+
+    np.testing.assert_array_equal(ma.getdata(actual.body.data), ma.getdata(expected.body.data))
+    np.testing.assert_array_equal(actual.body.confidence, expected.body.confidence)
+
+
+def test_alphabets_are_loaded_per_language_pair():
+    lookup = FingerspellingPoseLookup()
+    assert lookup.alphabets == {}
+
+    lookup.lookup("hallo", "hallo", "de", "sgg")
+    assert list(lookup.alphabets.keys()) == [("de", "sgg")]
+
+
+def test_alphabet_letters_share_one_array(lookup):
+    alphabet = lookup.get_alphabet("de", "sgg")
+    letter = alphabet.prepared_letter("a")
+
+    assert np.shares_memory(ma.getdata(letter.pose.body.data), alphabet.data)
+    assert not alphabet.data.flags.writeable
+
+
+def test_unsupported_language_pair(lookup):
+    with pytest.raises(FileNotFoundError, match="not supported for fingerspelling"):
+        lookup.lookup("hallo", "hallo", "xx", "yy")
+
+
+def test_segmentation_prefers_longest_letters(lookup):
+    alphabet = lookup.get_alphabet("de", "sgg")
+    assert alphabet.segment("schach") == ("sch", "a", "ch")
+    assert alphabet.segment("hallo") == ("h", "a", "l", "l", "o")
+
+
+def test_segmentation_is_memoized(lookup):
+    alphabet = lookup.get_alphabet("de", "sgg")
+    alphabet.segment.cache_clear()
+    for name in ["anna", "bernd", "anna", "anna"]:
+        alphabet.segment(name)
+    assert alphabet.segment.cache_info().hits == 2
+
+
+def test_segmentation_of_unknown_characters(lookup):
+    alphabet = lookup.get_alphabet("de", "sgg")
+    with pytest.raises(FileNotFoundError, match="Characters 42 not found"):
+        alphabet.segment("a42b")
+
+
+@pytest.mark.parametrize("is_first", [True, False])
+def test_junction_table_matches_pairwise_search(lookup, is_first):
+    alphabet = lookup.get_alphabet("de", "sgg")
+    for letter, next_letter in [("a", "b"), ("sch", "o"), ("l", "l")]:
+        pose = alphabet.trimmed_letter(letter, start=not is_first)
+        next_pose = alphabet.trimmed_letter(next_letter, start=True)
+
+        expected = find_best_connection_point(pose, next_pose)
+        assert alphabet.junction(letter, next_letter, is_first, False) == expected
+
+
+def test_last_junctions_are_computed_once(monkeypatch):
+    alphabet = FingerspellingPoseLookup().get_alphabet("de", "sgg")
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def counting_find_best_connection_points(poses):
+        calls.append(len(poses))
+        time.sleep(0.05)
+        return find_best_connection_points(poses)
+
+    monkeypatch.setattr(fingerspelling_lookup, "find_best_connection_points", counting_find_best_connection_points)
+
+    def request(_):
+        barrier.wait()
+        return alphabet.junction("a", "b", True, True)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        junctions = list(executor.map(request, range(8)))
+
+    assert len(set(junctions)) == 1
+    assert calls == [2]
@@ -0,0 +1,58 @@
+from spoken_to_signed.bin import _text_to_gloss
+from spoken_to_signed.text_to_gloss.gloss_cache import GlossCache
+from spoken_to_signed.text_to_gloss.types import GlossItem
+
+GLOSSES = [[GlossItem(word="kinder", gloss="kind"), GlossItem(word=None, gloss="PIZZA")]]
+
+
+class CountingGlosser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return GLOSSES
+
+
+def test_glosses_are_cached_in_memory():
+    cache = GlossCache()
+    glosser = CountingGlosser()
+
+    first = cache.get_or_gloss("simple", 1, "Kinder Pizza", "de", {}, glosser)
+    first[0].pop()
+    second = cache.get_or_gloss("simple", 1, "Kinder Pizza", "de", {}, glosser)
+
+    assert second == GLOSSES
+    assert glosser.calls == 1
+    # Other glossers, versions and options are cached separately
+    cache.get_or_gloss("simple", 2, "Kinder Pizza", "de", {}, glosser)
+    cache.get_or_gloss("simple", 1, "Kinder Pizza", "de", {"signed_language": "sgg"}, glosser)
+    assert glosser.calls == 3
+
+
+def test_glosses_are_persisted(tmp_path):
+    path = str(tmp_path / "glosses.sqlite")
+    glosser = CountingGlosser()
+
+    for _ in range(2):
+        # A new cache, e.g. in a new process, reads the persisted glosses
+        cache = GlossCache(path)
+        assert cache.get_or_gloss("nmt", 1, "Kinder Pizza", "de", {}, glosser) == GLOSSES
+        cache.close()
+
+    assert glosser.calls == 1
+
+
+def test_unserializable_options_are_not_cached():
+    cache = GlossCache()
+    glosser = CountingGlosser()
+    for _ in range(2):
+        cache.get_or_gloss("simple", 1, "Kinder", "de", {"model": object()}, glosser)
+    assert glosser.calls == 2
+
+
+def test_text_to_gloss_uses_cache_directory(tmp_path):
+    expected = _text_to_gloss("Kleine Kinder essen Pizza.", "de", "simple")
+    for _ in range(2):
+        assert _text_to_gloss("Kleine Kinder essen Pizza.", "de", "simple", str(tmp_path)) == expected
+    assert (tmp_path / "glosses.sqlite").is_file()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from spoken_to_signed.text_to_gloss import gpt
+
+openai = pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+
+def _gloss(text: str) -> list[str]:
+    return [" ".join(f"{word.upper()}/{word}" for word in text.split(" "))]
+
+
+class MockCompletionsHandler(BaseHTTPRequestHandler):
+    """Answers chat completions like an OpenAI-compatible server, glossing every word as its uppercase"""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        payload = json.loads(request["messages"][-1]["content"])
+        self.server.requests.append(payload)
+
+        if "broken" in payload.get("texts", [payload.get("text")]):
+            # Failed requests are not retried by the client, when they are bad requests
+            self.send_error(400, "Broken text")
+            return
+
+        if "texts" in payload:
+            # A packed response that can not be matched to its texts, when asked to
+            content = [_gloss(text) for text in payload["texts"] if text != "unmatched"]
+        else:
+            content = _gloss(payload["text"])
+
+        body = json.dumps(
+            {
+                "id": "mock",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": json.dumps(content)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockCompletionsHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address[:2]
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://{host}:{port}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_texts_are_packed_in_requests(mock_server):
+    texts = [f"kinder essen pizza {i}" for i in range(10)]
+    glosses = list(gpt.texts_to_gloss(texts, "de", "sgg", pack_size=4, requests_per_minute=6000))
+
+    assert [sentences[0][0].gloss for sentences in glosses] == ["KINDER"] * 10
+    assert [sentences[0][-1].word for sentences in glosses] == [str(i) for i in range(10)]
+    assert sorted(len(request["texts"]) for request in mock_server.requests) == [2, 4, 4]
+
+
+def test_unmatched_packs_are_glossed_one_by_one(mock_server):
+    glosses = list(gpt.texts_to_gloss(["kinder", "unmatched"], "de", "sgg"))
+
+    assert [sentences[0][0].gloss for sentences in glosses] == ["KINDER", "UNMATCHED"]
+    assert sorted(request.get("text") for request in mock_server.requests[1:]) == ["kinder", "unmatched"]
+
+
+def test_failed_packs_are_glossed_one_by_one(mock_server):
+    texts = ["kinder", "broken", "pizza", "essen", "kleine"]
+    results = asyncio.run(gpt.texts_to_gloss_async(texts, "de", "sgg", pack_size=4, return_exceptions=True))
+
+    # Only the failing text fails, the others of its pack are glossed one by one
+    assert isinstance(results[1], openai.BadRequestError)
+    assert [results[i][0][0].gloss for i in [0, 2, 3, 4]] == ["KINDER", "PIZZA", "ESSEN", "KLEINE"]
+    # The failed pack of four texts, then every text on its own (the last pack has a single text)
+    assert sorted(request.get("text", "") for request in mock_server.requests) == sorted(["", *texts])
+
+    # The synchronous glosser yields the texts before the failing one, then raises its error
+    glosses = gpt.texts_to_gloss(texts, "de", "sgg", pack_size=4)
+    assert next(glosses)[0][0].gloss == "KINDER"
+    with pytest.raises(openai.BadRequestError):
+        next(glosses)
+
+
+def test_glossing_within_an_event_loop(mock_server):
+    async def gloss():
+        awaited = await gpt.texts_to_gloss_async(["kinder", "pizza"], "de", "sgg")
+        # The synchronous glosser may still be called, e.g. by code that is not aware of the loop
+        called = list(gpt.texts_to_gloss(["kinder", "pizza"], "de", "sgg"))
+        return awaited, called
+
+    awaited, called = asyncio.run(gloss())
+    assert awaited == called
+    assert [sentences[0][0].gloss for sentences in awaited] == ["KINDER", "PIZZA"]
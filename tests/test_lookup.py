@@ -0,0 +1,189 @@
+import csv
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from spoken_to_signed.gloss_to_pose import CompiledPoseLookup, CSVPoseLookup, concatenate_poses
+from spoken_to_signed.gloss_to_pose.lookup.compiled_lookup import compile_index, has_compiled_index
+from spoken_to_signed.gloss_to_pose.lookup.pose_store import pack_poses
+
+FINGERSPELLING_LEXICON = Path("spoken_to_signed/assets/fingerspelling_lexicon")
+
+
+@pytest.fixture
+def dummy_lexicon(tmp_path) -> str:
+    directory = tmp_path / "dummy_lexicon"
+    shutil.copytree("assets/dummy_lexicon", directory)
+    return str(directory)
+
+
+@pytest.fixture
+def fingerspelling_index(tmp_path) -> str:
+    # Only the index is needed to compare rows, not the pose files
+    directory = tmp_path / "fingerspelling_lexicon"
+    directory.mkdir()
+    shutil.copy(FINGERSPELLING_LEXICON / "index.csv", directory / "index.csv")
+    return str(directory)
+
+
+def test_compiled_lookup_requires_compiled_index(dummy_lexicon):
+    assert not has_compiled_index(dummy_lexicon)
+    with pytest.raises(ValueError, match="compiled index"):
+        CompiledPoseLookup(dummy_lexicon)
+
+
+def test_compiled_lookup_matches_csv_rows(fingerspelling_index):
+    compile_index(fingerspelling_index)
+    assert has_compiled_index(fingerspelling_index)
+
+    csv_lookup = CSVPoseLookup(fingerspelling_index)
+    compiled_lookup = CompiledPoseLookup(fingerspelling_index)
+
+    assert sorted(compiled_lookup.language_pairs()) == sorted(csv_lookup.language_pairs())
+
+    with open(Path(fingerspelling_index) / "index.csv", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    for row in rows:
+        for based_on in ["words", "glosses"]:
+            for term in [row[based_on], row[based_on].upper(), row[based_on] + "?"]:
+                args = (based_on, row["spoken_language"], row["signed_language"], term)
+                assert compiled_lookup.get_rows(*args) == csv_lookup.get_rows(*args)
+
+
+def test_compiled_lookup_returns_same_poses(dummy_lexicon):
+    compile_index(dummy_lexicon)
+
+    csv_lookup = CSVPoseLookup(dummy_lexicon)
+    compiled_lookup = CompiledPoseLookup(dummy_lexicon)
+
+    for word in ["kleine", "Kinder", "essen", "pizza"]:
+        expected = csv_lookup.lookup(word, word, "de", "sgg").pose
+        actual = compiled_lookup.lookup(word, word, "de", "sgg").pose
+        np.testing.assert_array_equal(actual.body.data, expected.body.data)
+
+    with pytest.raises(FileNotFoundError):
+        compiled_lookup.lookup("zürich", "zürich", "de", "sgg")
+
+
+def test_recompiling_does_not_modify_open_index(dummy_lexicon):
+    compile_index(dummy_lexicon)
+    lookup = CompiledPoseLookup(dummy_lexicon)
+    assert lookup.get_rows("words", "de", "sgg", "pizza") is not None
+
+    with open(Path(dummy_lexicon) / "index.csv", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    (Path(dummy_lexicon) / "index.csv").write_text("\n".join(lines[:-1]) + "\n", encoding="utf-8")
+    compile_index(dummy_lexicon)
+
+    # The open index keeps reading its own files, new lookups read the new index
+    removed_word = lines[-1].split(",")[5]
+    assert lookup.get_rows("words", "de", "sgg", removed_word) is not None
+    assert CompiledPoseLookup(dummy_lexicon).get_rows("words", "de", "sgg", removed_word) is None
+    assert not [p.name for p in Path(dummy_lexicon).iterdir() if p.name.startswith(".")]
+
+
+def test_pose_store_returns_same_poses(dummy_lexicon):
+    csv_lookup = CSVPoseLookup(dummy_lexicon)
+    expected = {word: csv_lookup.lookup(word, word, "de", "sgg").pose for word in ["kleine", "kinder", "pizza"]}
+
+    pack_poses(dummy_lexicon)
+    packed_lookup = CSVPoseLookup(dummy_lexicon)
+    assert packed_lookup.pose_store is not None
+    assert "sgg/kinder.pose" in packed_lookup.pose_store
+
+    for word, expected_pose in expected.items():
+        pose = packed_lookup.lookup(word, word, "de", "sgg").pose
+        assert pose.body.fps == expected_pose.body.fps
+        np.testing.assert_array_equal(pose.body.data, expected_pose.body.data)
+        np.testing.assert_array_equal(pose.body.confidence, expected_pose.body.confidence)
+
+
+def test_pose_store_reads_are_independent(dummy_lexicon):
+    pack_poses(dummy_lexicon)
+    store = CSVPoseLookup(dummy_lexicon).pose_store
+    whole = store.read_pose("sgg/kinder.pose")
+
+    # Only the requested frames are read, into arrays of their own
+    pose = store.read_pose("sgg/kinder.pose", slice(2, 5))
+    assert not np.shares_memory(np.ma.getdata(pose.body.data), store.data)
+    np.testing.assert_array_equal(pose.body.data, whole.body.data[2:5])
+    np.testing.assert_array_equal(pose.body.confidence, whole.body.confidence[2:5])
+
+    # In-place changes of a read pose are not seen by later reads
+    pose.body.data -= 1
+    np.testing.assert_array_equal(store.read_pose("sgg/kinder.pose", slice(2, 5)).body.data, whole.body.data[2:5])
+
+
+def test_repacking_does_not_modify_open_store(dummy_lexicon):
+    pack_poses(dummy_lexicon)
+    lookup = CSVPoseLookup(dummy_lexicon)
+    original = np.array(lookup.pose_store.data)
+
+    with open(Path(dummy_lexicon) / "index.csv", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    (Path(dummy_lexicon) / "index.csv").write_text("\n".join([lines[0], lines[-1]]) + "\n", encoding="utf-8")
+    pack_poses(dummy_lexicon)
+
+    # The open store keeps reading its own files, new lookups read the new store
+    np.testing.assert_array_equal(lookup.pose_store.data, original)
+    assert len(CSVPoseLookup(dummy_lexicon).pose_store.data) < len(original)
+    assert not [p.name for p in Path(dummy_lexicon).iterdir() if p.name.startswith(".")]
+
+
+def test_pose_store_is_not_modified_by_concatenation(dummy_lexicon):
+    pack_poses(dummy_lexicon)
+    lookup = CSVPoseLookup(dummy_lexicon)
+    original = np.array(lookup.pose_store.data)
+
+    poses = [lookup.lookup(word, word, "de", "sgg").pose for word in ["kleine", "kinder"]]
+    concatenate_poses(poses)
+
+    np.testing.assert_array_equal(lookup.pose_store.data, original)
+
+
+def test_plan_resolves_without_loading():
+    lookup = CSVPoseLookup("assets/dummy_lexicon", backup=CSVPoseLookup("assets/dummy_lexicon"))
+    plan = lookup.plan([("Kinder", "KIND"), ("", ""), ("zürich", "ZÜRICH")], "de", "sgg")
+
+    kinder, zurich = plan.lookups
+    assert kinder.row["path"] == "sgg/kinder.pose"
+    assert not kinder.use_backup
+    assert zurich.row is None
+    assert zurich.use_backup
+    assert len(lookup.cache) == 0
+
+
+def test_plan_executes_repeated_signs_once():
+    lookup = CSVPoseLookup("assets/dummy_lexicon")
+    sentences = [[("kinder", "kinder"), ("pizza", "pizza"), ("Kinder", "KIND")], [("pizza", "pizza")]]
+
+    plans = [lookup.plan(sentence, "de", "sgg") for sentence in sentences]
+    results = lookup.execute_plans(plans)
+
+    assert [len(r) for r in results] == [3, 1]
+    assert results[0][0].key == results[0][2].key
+    assert results[0][0].pose is not results[0][2].pose
+    # Each of the two distinct files is read once
+    assert lookup.cache.stats().misses == 2
+    assert lookup.cache.stats().hits == 0
+
+
+def test_plan_caches_results_of_every_word_of_a_row():
+    lookup = CSVPoseLookup("assets/dummy_lexicon")
+    plan = lookup.plan([("kinder", "kinder"), ("Kinder", "KIND")], "de", "sgg")
+    lookup.execute_plans([plan])
+
+    # Both words resolved to the same row, so both are cached, although the row was loaded once
+    assert ("kinder", "kinder", "de", "sgg", None) in lookup.result_cache
+    assert ("Kinder", "KIND", "de", "sgg", None) in lookup.result_cache
+    assert lookup.result_cache.stats().misses == 1
+
+
+def test_plan_without_poses_raises():
+    lookup = CSVPoseLookup("assets/dummy_lexicon")
+    plan = lookup.plan([("zürich", "ZÜRICH")], "de", "sgg")
+    with pytest.raises(Exception, match="No poses found"):
+        lookup.execute_plans([plan])
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from spoken_to_signed.lru_cache import LRUCache
+
+
+def test_evicts_by_bytes():
+    cache = LRUCache(max_bytes=250)
+    for key in "abc":
+        cache.set(key, np.zeros(100, dtype=np.uint8))
+
+    assert "a" not in cache
+    assert "b" in cache
+    assert "c" in cache
+    assert cache.stats().bytes == 200
+    assert cache.stats().evictions == 1
+
+
+def test_resize_evicts_down_to_the_new_bound():
+    cache = LRUCache(max_bytes=None)
+    for key in "abc":
+        cache.set(key, np.zeros(100, dtype=np.uint8))
+
+    cache.resize(150)
+    assert "a" not in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats().bytes == 100
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = LRUCache(maxsize=2, max_bytes=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_oversized_values_are_not_cached():
+    cache = LRUCache(max_bytes=50)
+    cache.set("small", np.zeros(10, dtype=np.uint8))
+    cache.set("large", np.zeros(100, dtype=np.uint8))
+
+    assert "small" in cache
+    assert "large" not in cache
+
+
+def test_get_or_load_counts_hits_and_misses():
+    cache = LRUCache()
+    assert cache.get_or_load("a", lambda key: key * 2) == "aa"
+    assert cache.get_or_load("a", lambda key: pytest.fail("should be cached")) == "aa"
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+
+
+def test_get_or_load_shares_concurrent_loads():
+    cache = LRUCache()
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def load(key):
+        calls.append(key)
+        time.sleep(0.1)
+        return key.upper()
+
+    def request(_):
+        barrier.wait()
+        return cache.get_or_load("pose", load)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(request, range(8)))
+
+    assert results == ["POSE"] * 8
+    assert calls == ["pose"]
+
+
+def test_get_or_load_propagates_errors_without_caching():
+    cache = LRUCache()
+
+    def load(key):
+        raise FileNotFoundError(key)
+
+    with pytest.raises(FileNotFoundError):
+        cache.get_or_load("missing", load)
+    assert "missing" not in cache
+    assert cache.get_or_load("missing", lambda key: "found") == "found"
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = LRUCache(ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+
+    now[0] = 9
+    assert cache.get("a") == 1
+    now[0] = 10
+    assert cache.get("a") is None
+    assert cache.stats().expirations == 1
+    assert cache.stats().entries == 0
+
+
+def test_hit_rate():
+    cache = LRUCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats().hit_rate == 0.5
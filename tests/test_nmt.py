@@ -0,0 +1,74 @@
+import sys
+import types
+
+import pytest
+
+from spoken_to_signed.text_to_gloss import nmt
+
+
+class FakeTranslator:
+    def __init__(self, batch_size: int, **kwargs):
+        self.batch_size = batch_size
+        self.translated = []
+
+    def translate(self, inputs, fill_up_batches=True):
+        # Like sockeye, short batches are filled up with copies of their last input, unless asked not to
+        batch = list(inputs)
+        if fill_up_batches and len(batch) % self.batch_size != 0:
+            batch += batch[-1:] * (self.batch_size - len(batch) % self.batch_size)
+        self.translated.append(len(batch))
+        return [types.SimpleNamespace(nbest_translations=[source.upper()]) for source in batch]
+
+
+class FakeSentencePiece:
+    def encode(self, text, out_type=str):
+        return ["▁" + word for word in text.split(" ")]
+
+
+@pytest.fixture
+def sockeye(monkeypatch):
+    """Stubs sockeye, torch and the models, recording the translators that are built and the torch threads."""
+    translators = []
+    threads = []
+
+    def make_translator(**kwargs):
+        translators.append(FakeTranslator(**kwargs))
+        return translators[-1]
+
+    inference = types.ModuleType("sockeye.inference")
+    inference.Translator = make_translator
+    inference.CandidateScorer = lambda: None
+    # The tag is left out, so that translations are the uppercase input
+    inference.make_input_from_plain_string = lambda i, text: text.split(" ", 1)[1]
+    sockeye_module = types.ModuleType("sockeye")
+    sockeye_module.inference = inference
+    torch = types.ModuleType("torch")
+    torch.set_num_threads = threads.append
+
+    monkeypatch.setitem(sys.modules, "sockeye", sockeye_module)
+    monkeypatch.setitem(sys.modules, "sockeye.inference", inference)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    models = {"dgs_de": {"sockeye_models": [], "spm_model": FakeSentencePiece()}}
+    models["dgs_de"].update(sockeye_source_vocabs=[], sockeye_target_vocabs=[])
+    monkeypatch.setattr(nmt, "load_sockeye_models", lambda: ("cpu", {}, models))
+    monkeypatch.setattr(nmt, "TRANSLATORS", {})
+    return types.SimpleNamespace(translators=translators, threads=threads)
+
+
+def test_short_batches_are_not_filled_up(sockeye):
+    nmt.text_to_gloss("kinder essen pizza", "de")
+    list(nmt.texts_to_gloss([f"text {i}" for i in range(5)], "de", batch_size=4))
+    glosses = list(nmt.texts_to_gloss(["kinder", "pizza"], "de", batch_size=4))
+    assert [[item.gloss for item in sentence] for [sentence] in glosses] == [["KINDER"], ["PIZZA"]]
+
+    # A single sentence, then batches of 4 and 1, and 2, each built once per configured batch size
+    assert [translator.batch_size for translator in sockeye.translators] == [16, 4]
+    assert [translator.translated for translator in sockeye.translators] == [[1], [4, 1, 2]]
+
+
+def test_threads_are_set_for_every_call(sockeye):
+    list(nmt.texts_to_gloss(["kinder"], "de", n_process=2))
+    list(nmt.texts_to_gloss(["kinder"], "de", n_process=4))
+
+    assert len(sockeye.translators) == 1
+    assert sockeye.threads == [2, 4]
@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+
+from spoken_to_signed.gloss_to_pose import CSVPoseLookup, PreparedPoseCache, gloss_to_pose
+from spoken_to_signed.gloss_to_pose.prepared_cache import read_prepared_pose, write_prepared_pose
+from spoken_to_signed.text_to_gloss.types import GlossItem
+
+SENTENCE = [GlossItem(word=w, gloss=w) for w in ["kleine", "kinder", "essen", "kinder", "pizza"]]
+
+
+@pytest.fixture
+def lookup() -> CSVPoseLookup:
+    return CSVPoseLookup("assets/dummy_lexicon")
+
+
+def _assert_same_pose(actual, expected):
+    np.testing.assert_array_equal(ma.getdata(actual.body.data), ma.getdata(expected.body.data))
+    np.testing.assert_array_equal(ma.getmaskarray(actual.body.data), ma.getmaskarray(expected.body.data))
+    np.testing.assert_array_equal(actual.body.confidence, expected.body.confidence)
+
+
+def test_cached_preparation_matches_uncached(lookup):
+    expected = gloss_to_pose(SENTENCE, lookup, "de", "sgg").pose
+
+    cache = PreparedPoseCache()
+    for _ in range(2):
+        actual = gloss_to_pose(SENTENCE, lookup, "de", "sgg", prepared_cache=cache).pose
+        _assert_same_pose(actual, expected)
+
+    stats = cache.memory.stats()
+    assert stats.misses == 4  # one per distinct sign
+    assert stats.hits == 6
+
+
+def test_prepared_poses_are_persisted(lookup, tmp_path, monkeypatch):
+    expected = gloss_to_pose(SENTENCE, lookup, "de", "sgg", prepared_cache=PreparedPoseCache(str(tmp_path))).pose
+    assert len(list(tmp_path.glob("*.npz"))) == 4
+
+    # A new cache, e.g. in a new process, reads the persisted poses instead of preparing them again
+    def fail_prepare(pose):
+        raise AssertionError("Pose should have been read from disk")
+
+    monkeypatch.setattr("spoken_to_signed.gloss_to_pose.prepared_cache.prepare_pose", fail_prepare)
+    actual = gloss_to_pose(SENTENCE, lookup, "de", "sgg", prepared_cache=PreparedPoseCache(str(tmp_path))).pose
+    _assert_same_pose(actual, expected)
+
+
+def test_changed_lexicon_files_are_prepared_again(tmp_path):
+    lexicon = tmp_path / "lexicon"
+    shutil.copytree("assets/dummy_lexicon", lexicon)
+    cache = PreparedPoseCache(str(tmp_path / "cache"))
+    cache.prepare(CSVPoseLookup(str(lexicon)).lookup("pizza", "pizza", "de", "sgg"))
+
+    # A new download of the lexicon replaces the file, which is then prepared again
+    pose_path = lexicon / "sgg" / "pizza.pose"
+    pose_path.write_bytes(pose_path.read_bytes())
+    os.utime(pose_path, ns=(0, 0))
+    cache.prepare(CSVPoseLookup(str(lexicon)).lookup("pizza", "pizza", "de", "sgg"))
+
+    assert cache.memory.stats().misses == 2
+    assert len(list((tmp_path / "cache").glob("*.npz"))) == 2
+
+
+def test_prepared_pose_round_trip(lookup, tmp_path):
+    cache = PreparedPoseCache()
+    prepared = cache.prepare(lookup.lookup("pizza", "pizza", "de", "sgg"))
+
+    path = str(tmp_path / "pizza.npz")
+    write_prepared_pose(path, prepared)
+    loaded = read_prepared_pose(path)
+
+    assert loaded.boundary == prepared.boundary
+    assert loaded.pose.body.fps == prepared.pose.body.fps
+    _assert_same_pose(loaded.pose, prepared.pose)
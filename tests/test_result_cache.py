@@ -0,0 +1,91 @@
+import sys
+
+import numpy as np
+import pytest
+
+from spoken_to_signed.gloss_to_pose import CSVPoseLookup
+from spoken_to_signed.gloss_to_pose.lookup.result_cache import LookupResultCache
+
+
+class CountingLookup(CSVPoseLookup):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def lookup_uncached(self, *args, **kwargs):
+        self.calls += 1
+        return super().lookup_uncached(*args, **kwargs)
+
+
+def test_repeated_words_are_cached():
+    lookup = CountingLookup("assets/dummy_lexicon")
+    first = lookup.lookup("pizza", "pizza", "de", "sgg")
+    second = lookup.lookup("pizza", "pizza", "de", "sgg")
+
+    assert lookup.calls == 1
+    assert second.key == first.key
+    # Every caller gets its own pose, sharing the arrays
+    assert second.pose is not first.pose
+    assert second.pose.body.data is first.pose.body.data
+    assert lookup.result_cache.stats().hit_rate == 0.5
+
+
+def test_misses_are_cached():
+    lookup = CountingLookup("assets/dummy_lexicon")
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            lookup.lookup("unknown", "unknown", "de", "sgg")
+
+    assert lookup.calls == 1
+
+
+def test_misses_expire_after_negative_ttl():
+    now = [0.0]
+    result_cache = LookupResultCache(negative_ttl=60, clock=lambda: now[0])
+    lookup = CountingLookup("assets/dummy_lexicon", result_cache=result_cache)
+
+    for time in [0, 30, 60]:
+        now[0] = time
+        with pytest.raises(FileNotFoundError):
+            lookup.lookup("unknown", "unknown", "de", "sgg")
+
+    assert lookup.calls == 2
+
+
+class EverythingLookup(CSVPoseLookup):
+    def lookup_uncached(self, word, gloss, spoken_language, signed_language, source=None):
+        return super().lookup_uncached("pizza", "pizza", spoken_language, signed_language, source)
+
+
+def test_backup_lookups_are_cached_separately():
+    lookup = CountingLookup("assets/dummy_lexicon")
+    with pytest.raises(FileNotFoundError):
+        lookup.lookup("unknown", "unknown", "de", "sgg")
+
+    # The miss of the lookup without backup is not reused by the lookup with backup
+    with_backup = lookup.with_backup(EverythingLookup("assets/dummy_lexicon"))
+    assert with_backup.lookup("unknown", "unknown", "de", "sgg").pose is not None
+
+
+def owned_nbytes(array) -> int:
+    # The bytes an array keeps alive, which are those of its root base for views
+    while array.base is not None:
+        array = array.base
+    return array.nbytes
+
+
+def test_cached_results_do_not_keep_source_poses_alive():
+    lookup = CountingLookup("assets/dummy_lexicon")
+    result = lookup.lookup("pizza", "pizza", "de", "sgg")
+
+    # The whole-file pose is evicted, only the cached result remains
+    lookup.cache.clear()
+
+    body = result.pose.body
+    kept_alive = (
+        owned_nbytes(np.ma.getdata(body.data))
+        + owned_nbytes(np.ma.getmaskarray(body.data))
+        + owned_nbytes(body.confidence)
+    )
+    # The cached result is its pose and its key
+    assert lookup.result_cache.stats().bytes == kept_alive + sys.getsizeof(result.key)
@@ -1,4 +1,5 @@
 """Tests for rules.py helper functions."""
+from spoken_to_signed.text_to_gloss import rules
 from spoken_to_signed.text_to_gloss.rules import _to_infinitive, attach_svp, expand_contractions_de, gloss_de_poss_pronoun
 
 
@@ -160,3 +161,49 @@ class TestGlossDePossPronoun:
 
     def test_euer(self):
         assert gloss_de_poss_pronoun(self._token("euer")) == "euer-IX"
+
+
+# ---------------------------------------------------------------------------
+# texts_to_gloss_given_spacy_model
+# ---------------------------------------------------------------------------
+
+
+class MockPipeModel:
+    """Stand-in for a spaCy Language whose `pipe` returns the (preprocessed) text as the doc."""
+
+    def __init__(self):
+        self.pipe_kwargs = None
+
+    def pipe(self, texts, as_tuples=False, **kwargs):
+        self.pipe_kwargs = kwargs
+        assert as_tuples
+        return iter(list(texts))
+
+
+def _mock_doc_to_gloss(doc, lang, punctuation=False):
+    return {"glosses": doc.split(), "tokens": doc.split(), "gloss_string": doc}
+
+
+class TestTextsToGlossGivenSpacyModel:
+    @staticmethod
+    def _gloss(monkeypatch, texts, model=None, **kwargs):
+        monkeypatch.setattr(rules, "doc_to_gloss", _mock_doc_to_gloss)
+        return list(rules.texts_to_gloss_given_spacy_model(texts, model or MockPipeModel(), **kwargs))
+
+    def test_docs_keep_order(self, monkeypatch):
+        outputs = self._gloss(monkeypatch, ["Kinder essen", "Pizza"])
+        assert [o["gloss_string"] for o in outputs] == ["Kinder essen", "Pizza"]
+
+    def test_empty_text(self, monkeypatch):
+        outputs = self._gloss(monkeypatch, ["Pizza", " ", "Kinder"])
+        assert len(outputs) == 3
+        assert outputs[1] == rules.empty_gloss_output()
+
+    def test_contractions_expanded(self, monkeypatch):
+        outputs = self._gloss(monkeypatch, ["gibt's Pizza"], lang="de")
+        assert outputs[0]["gloss_string"] == "gibt es Pizza"
+
+    def test_pipe_arguments(self, monkeypatch):
+        model = MockPipeModel()
+        self._gloss(monkeypatch, ["Pizza"], model=model, batch_size=64, n_process=2)
+        assert model.pipe_kwargs == {"batch_size": 64, "n_process": 2}
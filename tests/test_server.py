@@ -0,0 +1,68 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+from pose_format import Pose
+
+from spoken_to_signed.server import TranslationServer
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = TranslationServer(("127.0.0.1", 0), "assets/dummy_lexicon")
+    server.warm_up()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url: str, request: dict) -> bytes:
+    data = json.dumps(request).encode()
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, method="POST")) as response:
+        return response.read()
+
+
+def test_health(server_url):
+    with urllib.request.urlopen(f"{server_url}/health") as response:
+        assert response.read() == b"ok"
+
+
+def test_text_to_gloss_to_pose(server_url):
+    request = {"text": "Kleine Kinder essen Pizza.", "spoken_language": "de", "signed_language": "sgg"}
+
+    # Repeated requests are served by the same, warm, process
+    for _ in range(2):
+        pose = Pose.read(_post(f"{server_url}/text_to_gloss_to_pose", request))
+        assert pose.body.data.shape[0] > 0
+
+
+def test_cache_stats(server_url):
+    request = {"text": "Pizza", "spoken_language": "de", "signed_language": "sgg"}
+    for _ in range(2):
+        _post(f"{server_url}/text_to_gloss_to_pose", request)
+
+    with urllib.request.urlopen(f"{server_url}/stats") as response:
+        stats = json.loads(response.read())
+    assert stats["results_with_fingerspelling"]["hits"] >= 1
+    assert 0 < stats["results_with_fingerspelling"]["hit_rate"] <= 1
+    assert stats["glosses"]["hits"] >= 1
+
+
+def test_invalid_request(server_url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _post(f"{server_url}/text_to_gloss_to_pose", {"text": "Pizza"})
+    assert error.value.code == 400
+
+
+def test_untranslatable_request(server_url):
+    request = {"text": "abcd", "spoken_language": "de", "signed_language": "sgg", "disable_fingerspelling": True}
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _post(f"{server_url}/text_to_gloss_to_pose", request)
+    assert error.value.code == 422
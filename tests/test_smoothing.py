@@ -0,0 +1,159 @@
+import copy
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+import scipy.signal
+from pose_format import Pose, PoseHeader
+from pose_format.numpy import NumPyPoseBody
+from pose_format.pose_header import PoseHeaderComponent
+
+from spoken_to_signed.gloss_to_pose.concatenate import prepare_pose
+from spoken_to_signed.gloss_to_pose.smoothing import (
+    concatenate_poses,
+    create_padding,
+    find_best_connection_point,
+    find_best_connection_points,
+    hands_and_upper_body_points,
+    join_segments,
+    pose_savgol_filter,
+)
+
+SIGNS = ["kleine", "kinder", "essen", "pizza"]
+
+
+def _load_pose(name: str) -> Pose:
+    with open(f"assets/dummy_lexicon/sgg/{name}.pose", "rb") as f:
+        return Pose.read(f.read())
+
+
+def _reference_savgol_filter(pose: Pose):
+    """The original per-point implementation, kept as a regression reference."""
+    [face_component] = [c for c in pose.header.components if c.name == "FACE_LANDMARKS"]
+    face_range = range(
+        pose.header._get_point_index("FACE_LANDMARKS", face_component.points[0]),
+        pose.header._get_point_index("FACE_LANDMARKS", face_component.points[-1]),
+    )
+
+    _, people, points, dims = pose.body.data.shape
+    for person in range(people):
+        for p in range(points):
+            if p not in face_range:
+                for d in range(dims):
+                    pose.body.data[:, person, p, d] = scipy.signal.savgol_filter(pose.body.data[:, person, p, d], 3, 1)
+    return pose
+
+
+def _assert_same_body(actual: Pose, expected: Pose):
+    np.testing.assert_allclose(ma.getdata(actual.body.data), ma.getdata(expected.body.data), rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(ma.getmaskarray(actual.body.data), ma.getmaskarray(expected.body.data))
+
+
+def test_pose_savgol_filter_matches_reference():
+    pose = _load_pose("kinder")
+    expected = _reference_savgol_filter(copy.deepcopy(pose))
+    actual = pose_savgol_filter(copy.deepcopy(pose))
+    _assert_same_body(actual, expected)
+
+
+def test_pose_savgol_filter_multiple_people():
+    pose = _load_pose("pizza")
+    data = ma.concatenate([pose.body.data, pose.body.data[::-1]], axis=1)
+    confidence = np.concatenate([pose.body.confidence, pose.body.confidence[::-1]], axis=1)
+    pose = Pose(pose.header, NumPyPoseBody(fps=pose.body.fps, data=data, confidence=confidence))
+
+    expected = _reference_savgol_filter(copy.deepcopy(pose))
+    actual = pose_savgol_filter(copy.deepcopy(pose))
+    _assert_same_body(actual, expected)
+
+
+def test_pose_savgol_filter_keeps_face():
+    pose = _load_pose("essen")
+    face_start = pose.header._get_point_index("FACE_LANDMARKS", pose.header.components[1].points[0])
+    original_face = ma.getdata(pose.body.data)[:, :, face_start].copy()
+
+    smoothed = pose_savgol_filter(pose)
+    np.testing.assert_array_equal(ma.getdata(smoothed.body.data)[:, :, face_start], original_face)
+
+
+def test_find_best_connection_points_matches_pairwise():
+    poses = [_load_pose(name) for name in SIGNS + SIGNS[::-1]]
+    expected = [find_best_connection_point(a, b) for a, b in zip(poses, poses[1:])]
+    assert find_best_connection_points(poses) == expected
+    assert find_best_connection_points(poses, dtype=np.float32) == expected
+
+
+@pytest.mark.parametrize("features", ["hands_body", "pca"])
+def test_find_best_connection_points_reduced_features(features):
+    poses = [_load_pose(name) for name in SIGNS]
+    junctions = find_best_connection_points(poses, features=features)
+
+    assert len(junctions) == len(poses) - 1
+    for (end, start), pose, next_pose in zip(junctions, poses, poses[1:]):
+        assert 0 <= end < len(pose.body.data)
+        assert 0 <= start < len(next_pose.body.data)
+
+
+def test_hands_and_upper_body_points():
+    pose = _load_pose("pizza")
+    points = hands_and_upper_body_points(pose)
+    names = [(c.name, p) for c in pose.header.components for p in c.points]
+
+    assert all(names[i][0] != "FACE_LANDMARKS" for i in points)
+    assert ("POSE_LANDMARKS", "LEFT_WRIST") in [names[i] for i in points]
+    assert all("KNEE" not in names[i][1] for i in points)
+
+
+HOLISTIC_BODY_POINTS = [
+    "NOSE", "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER", "RIGHT_EYE_INNER", "RIGHT_EYE", "RIGHT_EYE_OUTER",
+    "LEFT_EAR", "RIGHT_EAR", "MOUTH_LEFT", "MOUTH_RIGHT", "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_ELBOW",
+    "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST", "LEFT_PINKY", "RIGHT_PINKY", "LEFT_INDEX", "RIGHT_INDEX",
+    "LEFT_THUMB", "RIGHT_THUMB", "LEFT_HIP", "RIGHT_HIP", "LEFT_KNEE", "RIGHT_KNEE", "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL", "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+]  # fmt: skip
+
+
+def test_hands_and_upper_body_points_exclude_head():
+    # Unreduced holistic poses have head points in their body component as well
+    pose = _load_pose("pizza")
+    components = [
+        PoseHeaderComponent("POSE_LANDMARKS", HOLISTIC_BODY_POINTS, [], [], "XYZC"),
+        *pose.header.components[1:],
+    ]
+    pose = Pose(PoseHeader(pose.header.version, pose.header.dimensions, components), pose.body)
+    names = [p for c in pose.header.components if c.name == "POSE_LANDMARKS" for p in c.points]
+
+    points = [names[i] for i in hands_and_upper_body_points(pose) if i < len(names)]
+    assert points == [
+        "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_ELBOW", "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST",
+        "LEFT_PINKY", "RIGHT_PINKY", "LEFT_INDEX", "RIGHT_INDEX", "LEFT_THUMB", "RIGHT_THUMB", "LEFT_HIP", "RIGHT_HIP",
+    ]  # fmt: skip
+
+
+def test_find_best_connection_points_unknown_features():
+    poses = [_load_pose(name) for name in SIGNS[:2]]
+    with pytest.raises(ValueError, match="Unknown connection features"):
+        find_best_connection_points(poses, features="face")
+
+
+def test_join_segments_only_changes_junctions():
+    segments = [prepare_pose(_load_pose(name), trim=False).pose for name in SIGNS]
+    padding = create_padding(0.2, segments[0])
+
+    expected = pose_savgol_filter(concatenate_poses([Pose(s.header, copy.copy(s.body)) for s in segments], padding))
+    actual = join_segments(segments, padding)
+    assert actual.body.data.shape == expected.body.data.shape
+
+    data, expected_data = ma.getdata(actual.body.data), ma.getdata(expected.body.data)
+    start = 0
+    for segment in segments:
+        end = start + len(segment.body.data)
+        # Known frames further than one frame from a junction are copied through
+        known = segment.body.confidence[1:-1] > 0
+        np.testing.assert_array_equal(data[start + 1 : end - 1][known], ma.getdata(segment.body.data)[1:-1][known])
+
+        # Padding frames match the full interpolation and smoothing, for the points both of them interpolate
+        gap = slice(end, end + len(padding.data))
+        both = (actual.body.confidence[gap] > 0) & (expected.body.confidence[gap] > 0)
+        np.testing.assert_allclose(data[gap][both], expected_data[gap][both], atol=1e-6)
+        start = end + len(padding.data)
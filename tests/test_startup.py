@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules every entry point must not import at startup, as they are only needed by some of its commands
+ENTRY_POINTS = {
+    "spoken_to_signed.bin": ["pose_format", "numpy", "scipy", "spacy", "torch", "sockeye", "openai"],
+    "spoken_to_signed.text_to_gloss.nmt": ["torch", "sockeye", "sentencepiece", "requests"],
+    "spoken_to_signed.text_to_gloss.gpt": ["openai", "dotenv"],
+    "spoken_to_signed.gloss_to_pose": ["scipy.signal", "scipy.spatial"],
+    "spoken_to_signed.download_lexicon": ["scipy.signal", "tensorflow_datasets", "sign_language_datasets"],
+}
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Imports a module in a fresh interpreter, returning the cumulative import time (us) of every imported module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(("module", "deferred"), ENTRY_POINTS.items())
+def test_entry_point_startup(module, deferred):
+    times = import_times(module)
+    print(f"{module}: {times[module] / 1000:.1f} ms")
+
+    imported = [name for name in times if any(name == d or name.startswith(f"{d}.") for d in deferred)]
+    assert imported == []
+
+
+def test_text_to_gloss_does_not_load_poses():
+    # Glossing (and caching glosses) must not load the pose stack, which only gloss_to_pose needs
+    code = (
+        "import sys\n"
+        "from spoken_to_signed.bin import _text_to_gloss\n"
+        "_text_to_gloss('Kinder essen Pizza', 'de', 'simple')\n"
+        "print(','.join(m for m in ('pose_format', 'numpy', 'scipy') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
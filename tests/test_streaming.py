@@ -0,0 +1,101 @@
+import contextlib
+import io
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+
+from spoken_to_signed.gloss_to_pose import CSVPoseLookup, PreparedPoseCache, gloss_to_pose, stream_gloss_to_pose
+from spoken_to_signed.gloss_to_pose.concatenate import prepare_pose, trim_frames
+from spoken_to_signed.gloss_to_pose.streaming import stream_prepared_poses
+from spoken_to_signed.text_to_gloss.types import GlossItem
+
+
+def _sentence(words: list[str]):
+    return [GlossItem(word=w, gloss=w) for w in words]
+
+
+def _translate(words: list[str]):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return gloss_to_pose(_sentence(words), CSVPoseLookup("assets/dummy_lexicon"), "de", "sgg").pose
+
+
+def _stream(words: list[str], **kwargs):
+    return list(stream_gloss_to_pose(_sentence(words), CSVPoseLookup("assets/dummy_lexicon"), "de", "sgg", **kwargs))
+
+
+@pytest.mark.parametrize("words", [["pizza"], ["kinder", "pizza"]])
+def test_stream_matches_full_translation(words):
+    expected = _translate(words)
+    chunks = _stream(words)
+    assert len(chunks) == len(words)
+
+    data = ma.concatenate([chunk.body.data for chunk in chunks])
+    np.testing.assert_array_equal(ma.getdata(data), ma.getdata(expected.body.data))
+    np.testing.assert_array_equal(ma.getmaskarray(data), ma.getmaskarray(expected.body.data))
+    confidence = np.concatenate([chunk.body.confidence for chunk in chunks])
+    np.testing.assert_array_equal(confidence, expected.body.confidence)
+    assert chunks[0].header.dimensions.width == expected.header.dimensions.width
+
+
+def _points_missing_from_a_sign(words: list[str]) -> np.ndarray:
+    lookup = CSVPoseLookup("assets/dummy_lexicon")
+    missing = None
+    for i, word in enumerate(words):
+        pose, boundary = prepare_pose(lookup.lookup(word, word, "de", "sgg").pose)
+        first_frame, last_frame = trim_frames(pose, boundary, i > 0, i < len(words) - 1)
+        sign_missing = np.all(pose.body.confidence[first_frame:last_frame] == 0, axis=(0, 1))
+        missing = sign_missing if missing is None else missing | sign_missing
+
+    # `correct_wrists` moves the wrists to their hands, so a missing hand also changes its wrist
+    header = pose.header
+    for component in header.components:
+        if not component.name.endswith("_HAND_LANDMARKS"):
+            continue
+        hand = component.name.split("_")[0]
+        hand_points = [header._get_point_index(component.name, p) for p in component.points]
+        if np.any(missing[hand_points]):
+            missing[header._get_point_index("POSE_LANDMARKS", f"{hand}_WRIST")] = True
+    return missing
+
+
+def test_stream_of_long_sentence():
+    words = ["kleine", "kinder", "essen", "pizza"]
+    expected = _translate(words)
+    chunks = _stream(words, prepared_cache=PreparedPoseCache())
+
+    assert len(chunks) == len(words)
+    assert all(chunk.body.fps == expected.body.fps for chunk in chunks)
+    data = ma.getdata(ma.concatenate([chunk.body.data for chunk in chunks]))
+    assert data.shape == expected.body.data.shape
+
+    # Smoothing only looks one sign ahead, so only points that are missing in an entire sign (hands) may differ
+    header = expected.header
+    face_points = [header._get_point_index("FACE_LANDMARKS", p) for p in header.components[1].points]
+    compared = ~_points_missing_from_a_sign(words)
+    compared[face_points] = False
+    assert np.any(compared[: len(header.components[0].points)]), "body points are compared"
+    assert np.any(compared[-2 * len(header.components[-1].points) :]), "hand points are compared"
+    np.testing.assert_allclose(data[:, :, compared], ma.getdata(expected.body.data)[:, :, compared], atol=1e-6)
+
+    # The face is never smoothed, so it matches exactly
+    np.testing.assert_allclose(data[:, :, face_points], ma.getdata(expected.body.data)[:, :, face_points])
+
+
+def test_stream_yields_before_all_signs_are_prepared():
+    lookup = CSVPoseLookup("assets/dummy_lexicon")
+    consumed = []
+
+    def prepared_poses():
+        for word in ["kleine", "kinder", "essen", "pizza"]:
+            consumed.append(word)
+            yield prepare_pose(lookup.lookup(word, word, "de", "sgg").pose)
+
+    chunks = stream_prepared_poses(prepared_poses())
+    next(chunks)
+    assert consumed == ["kleine", "kinder", "essen"]
+
+
+def test_stream_without_poses():
+    with pytest.raises(ValueError, match="No poses"):
+        next(stream_prepared_poses([]))